@@ -1,89 +1,227 @@
-import streamlit as st
-import requests
-
-# Set a title for the app
-st.title("📄 Open-Source Legal LLM Analyzer")
-
-# --- UI Setup ---
-st.info(
-    "This tool uses open-source language models to analyze legal documents. "
-    "Upload a document, and it will perform risk analysis, summarization, and clause extraction."
-)
-
-st.sidebar.header("How to Use")
-st.sidebar.write("1. **Upload a document** in .txt format.")
-st.sidebar.write("2. Click the **Analyze Document** button.")
-st.sidebar.write(
-    "3. **Wait for the analysis.** This can take several minutes for long documents, "
-    "as the AI models are running on a CPU."
-)
-st.sidebar.warning(
-    "**Note:** This is a demonstration tool. Do not upload sensitive or confidential documents."
-)
-
-
-# File uploader widget
-uploaded_file = st.file_uploader("Upload your legal document (.txt file)", type=["txt"])
-
-# --- Main Logic ---
-if uploaded_file is not None:
-    # Read the text from the uploaded file
-    try:
-        document_text = uploaded_file.read().decode("utf-8")
-        st.text_area("Document Content", document_text, height=250)
-    except Exception as e:
-        st.error(f"Error reading or decoding the file: {e}")
-        document_text = None
-
-    if document_text and st.button("Analyze Document"):
-        # Display a spinner while the analysis is in progress
-        with st.spinner("Analyzing document... Please wait. This can take several minutes for large files..."):
-            try:
-                # --- FIX: Added a long timeout to prevent the 'Read timed out' error ---
-                # Sets a 10-minute (600 seconds) timeout for the request
-                response = requests.post(
-                    "http://127.0.0.1:8000/analyze",
-                    json={"text": document_text},
-                    timeout=600
-                )
-
-                # Check if the request was successful
-                if response.status_code == 200:
-                    results = response.json()
-                    st.success("Analysis Complete!")
-
-                    # Display the results in a structured way
-                    st.subheader("Risk Assessment")
-                    risk = results.get("risk_assessment", "Not available")
-                    if risk == "High Risk":
-                        st.error(f"**{risk}**")
-                    elif risk == "Medium Risk":
-                        st.warning(f"**{risk}**")
-                    else:
-                        st.success(f"**{risk}**")
-
-                    st.subheader("Executive Summary")
-                    st.write(results.get("summary", "Summary could not be generated."))
-
-                    st.subheader("Extracted Clauses & Entities")
-                    st.write("The model identified the following entities in the document:")
-                    # Displaying entities in a more readable format
-                    entities = results.get("extracted_clauses", [])
-                    if entities:
-                        st.table(entities)
-                    else:
-                        st.write("No specific entities were extracted.")
-
-                else:
-                    # Show a user-friendly error if the server returned a non-200 status
-                    st.error(f"Analysis failed. The server responded with status code: {response.status_code}")
-                    st.json(response.text) # Show the server's error message
-
-            except requests.exceptions.Timeout:
-                st.error(
-                    "Analysis timed out. The document is too long for the server to process "
-                    "within the time limit (10 minutes). Try a smaller document or a faster model."
-                )
-            except requests.exceptions.RequestException as e:
-                # Catch other potential connection errors (e.g., server not running)
-                st.error(f"Failed to connect to the analysis server: {e}")
\ No newline at end of file
+import json
+import time
+import streamlit as st
+import requests
+
+API_URL = "http://127.0.0.1:8000"
+POLL_INTERVAL_SECONDS = 2
+
+
+def render_risk(risk):
+    if risk == "High Risk":
+        st.error(f"**{risk}**")
+    elif risk == "Medium Risk":
+        st.warning(f"**{risk}**")
+    else:
+        st.success(f"**{risk}**")
+
+
+def render_risky_clauses(clauses, document_text):
+    """
+    Lists the clauses that matched the risk lexicon, highest score first.
+    """
+    if not clauses:
+        return
+    st.write("Clauses that contributed to the risk score:")
+    st.table([
+        {
+            "score": clause["score"],
+            "terms": ", ".join(sorted(set(clause["terms"]))),
+            "clause": document_text[clause["start"]:clause["end"]],
+        }
+        for clause in sorted(clauses, key=lambda c: -c["score"])
+    ])
+
+
+def render_results(results, document_text):
+    """
+    Displays the analysis results in a structured way.
+    """
+    st.success("Analysis Complete!")
+
+    st.subheader("Risk Assessment")
+    render_risk(results.get("risk_assessment", "Not available"))
+    render_risky_clauses(results.get("risky_clauses", []), document_text)
+
+    st.subheader("Executive Summary")
+    st.write(results.get("summary", "Summary could not be generated."))
+
+    st.subheader("Extracted Clauses & Entities")
+    st.write("The model identified the following entities in the document:")
+    # Displaying entities in a more readable format
+    entities = results.get("extracted_clauses", [])
+    if entities:
+        st.table(entities)
+    else:
+        st.write("No specific entities were extracted.")
+
+
+def analyze_streaming(document_text):
+    """
+    Calls the streaming endpoint and renders each part of the analysis as it arrives.
+    """
+    with requests.post(
+        f"{API_URL}/analyze/stream", json={"text": document_text}, stream=True, timeout=(10, 600)
+    ) as response:
+        if response.status_code != 200:
+            st.error(f"Analysis failed. The server responded with status code: {response.status_code}")
+            st.json(response.text)
+            return
+
+        st.subheader("Risk Assessment")
+        risk_placeholder = st.empty()
+        st.subheader("Executive Summary")
+        summary_placeholder = st.empty()
+        st.subheader("Extracted Clauses & Entities")
+        entities_placeholder = st.empty()
+        status_placeholder = st.empty()
+
+        entities = []
+        summaries = {}
+        for line in response.iter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            if record["type"] == "risk":
+                with risk_placeholder.container():
+                    render_risk(record["risk_assessment"])
+                    render_risky_clauses(record.get("risky_clauses", []), document_text)
+                status_placeholder.info("Extracting clauses...")
+            elif record["type"] == "entities":
+                entities.extend(record["entities"])
+                if entities:
+                    entities_placeholder.dataframe(entities)
+            elif record["type"] == "summary":
+                summaries[record["chunk"]] = record["summary"]
+                # Show the chunk summaries in document order as they fill in
+                summary_placeholder.write(" ".join(summaries[i] for i in sorted(summaries)))
+                status_placeholder.info(f"Summarized {len(summaries)} of {record['total_chunks']} chunks...")
+            elif record["type"] == "complete":
+                summary_placeholder.write(record["summary"] or "Summary could not be generated.")
+                if not entities:
+                    entities_placeholder.write("No specific entities were extracted.")
+                status_placeholder.success("Analysis Complete!")
+            elif record["type"] == "error":
+                status_placeholder.error(f"Analysis failed: {record['detail']}")
+
+
+def analyze_as_job(document_text):
+    """
+    Submits the document as a background job and polls for progress,
+    so long documents no longer depend on a single long HTTP request.
+    """
+    response = requests.post(f"{API_URL}/jobs", json={"text": document_text}, timeout=30)
+    while response.status_code == 429:
+        retry_after = int(response.headers.get("Retry-After", 5))
+        st.info(f"The server is busy. Retrying in {retry_after} seconds...")
+        time.sleep(retry_after)
+        response = requests.post(f"{API_URL}/jobs", json={"text": document_text}, timeout=30)
+
+    if response.status_code != 202:
+        # Show a user-friendly error if the server did not accept the job
+        st.error(f"Analysis failed. The server responded with status code: {response.status_code}")
+        st.json(response.text) # Show the server's error message
+        return
+
+    job_id = response.json()["job_id"]
+    progress_bar = st.progress(0.0, text="Analyzing document... Please wait.")
+    while True:
+        job = requests.get(f"{API_URL}/jobs/{job_id}", timeout=30).json()
+        stage = job.get("stage") or "queued"
+        progress_bar.progress(min(job.get("progress") or 0.0, 1.0), text=f"Analyzing document ({stage})...")
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+    if job["status"] == "completed":
+        render_results(job["result"], document_text)
+    else:
+        st.error(f"Analysis {job['status']}: {job.get('error') or 'no result was produced.'}")
+
+
+def entities_from_columns(columns):
+    """
+    Turns the columnar entity format back into one dict per entity.
+    """
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def analyze_upload(uploaded_file):
+    """
+    Sends the file itself to the upload endpoint, which extracts the text server-side.
+    Used for PDFs; entities come back in the compact columnar format.
+    """
+    with st.spinner("Extracting and analyzing document... Please wait."):
+        response = requests.post(
+            f"{API_URL}/analyze/upload",
+            files={"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type or "application/pdf")},
+            data={"entity_format": "columnar", "include_text": "true"},
+            timeout=(10, 600),
+        )
+    if response.status_code != 200:
+        st.error(f"Analysis failed. The server responded with status code: {response.status_code}")
+        st.json(response.text)
+        return
+
+    results = response.json()
+    results["extracted_clauses"] = entities_from_columns(results.get("extracted_clauses") or {})
+    document_text = results.pop("text", "")
+    st.text_area("Document Content", document_text, height=250)
+    render_results(results, document_text)
+
+
+# Set a title for the app
+st.title("📄 Open-Source Legal LLM Analyzer")
+
+# --- UI Setup ---
+st.info(
+    "This tool uses open-source language models to analyze legal documents. "
+    "Upload a document, and it will perform risk analysis, summarization, and clause extraction."
+)
+
+st.sidebar.header("How to Use")
+st.sidebar.write("1. **Upload a document** in .txt or .pdf format.")
+st.sidebar.write("2. Click the **Analyze Document** button.")
+st.sidebar.write(
+    "3. **Wait for the analysis.** Progress is shown while the job runs. Long documents "
+    "can take several minutes, as the AI models are running on a CPU."
+)
+stream_results = st.sidebar.checkbox("Show results as they are generated", value=True)
+st.sidebar.warning(
+    "**Note:** This is a demonstration tool. Do not upload sensitive or confidential documents."
+)
+
+
+# File uploader widget
+uploaded_file = st.file_uploader("Upload your legal document (.txt or .pdf file)", type=["txt", "pdf"])
+
+# --- Main Logic ---
+if uploaded_file is not None and uploaded_file.name.lower().endswith(".pdf"):
+    # PDFs are extracted by the API, so the text is shown once the analysis returns
+    if st.button("Analyze Document"):
+        try:
+            analyze_upload(uploaded_file)
+        except requests.exceptions.Timeout:
+            st.error("The analysis server did not respond in time. Please try again.")
+        except requests.exceptions.RequestException as e:
+            st.error(f"Failed to connect to the analysis server: {e}")
+elif uploaded_file is not None:
+    # Read the text from the uploaded file
+    try:
+        document_text = uploaded_file.read().decode("utf-8")
+        st.text_area("Document Content", document_text, height=250)
+    except Exception as e:
+        st.error(f"Error reading or decoding the file: {e}")
+        document_text = None
+
+    if document_text and st.button("Analyze Document"):
+        try:
+            if stream_results:
+                analyze_streaming(document_text)
+            else:
+                analyze_as_job(document_text)
+        except requests.exceptions.Timeout:
+            st.error("The analysis server did not respond in time. Please try again.")
+        except requests.exceptions.RequestException as e:
+            # Catch other potential connection errors (e.g., server not running)
+            st.error(f"Failed to connect to the analysis server: {e}")
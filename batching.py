@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads (i.e. many in-flight requests) into
+    shared batches for a model call.
+
+    A batch is flushed once it holds `max_batch_size` items or the oldest item has
+    waited `max_wait_ms`. `process_batch` receives a list of items and must return
+    one result per item, in the same order; each result is delivered to the future of
+    the request that submitted it. If it raises or returns the wrong number of results,
+    every request in the batch gets the error.
+    """
+    def __init__(self, process_batch, max_batch_size: int = 16, max_wait_ms: float = 10.0, name: str = "batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "failed_batches": 0,
+            "max_batch_size_seen": 0,
+            "total_queue_wait": 0.0,
+            "max_queue_wait": 0.0,
+            "batch_size_counts": {},
+        }
+
+    def submit(self, item) -> Future:
+        """
+        Queues one item and returns a Future for its result.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def submit_many(self, items):
+        return [self.submit(item) for item in items]
+
+    def stats(self):
+        """
+        Returns batch-size and queue-wait statistics since startup.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["batch_size_counts"] = dict(self._stats["batch_size_counts"])
+        batches = stats["batches"] or 1
+        stats["mean_batch_size"] = stats["items"] / batches
+        stats["mean_queue_wait_ms"] = 1000.0 * stats.pop("total_queue_wait") / max(stats["items"], 1)
+        stats["max_queue_wait_ms"] = 1000.0 * stats.pop("max_queue_wait")
+        stats["pending"] = self._queue.qsize()
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = self.max_wait * 1000.0
+        return stats
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-scheduler", daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self):
+        """
+        Blocks for the first item, then gathers more until the batch is full or the
+        first item's wait budget is spent.
+        """
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            waits = [started - submitted for _, _, submitted in batch]
+            items = [item for item, _, _ in batch]
+            failed = False
+            try:
+                results = list(self.process_batch(items))
+                if len(results) != len(items):
+                    raise ValueError(f"{self.name}: process_batch returned {len(results)} results for {len(items)} items")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                # Any error fails the whole batch; the scheduler thread must survive it
+                failed = True
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self._record(len(batch), waits, failed)
+
+    def _record(self, size: int, waits, failed: bool):
+        with self._stats_lock:
+            stats = self._stats
+            stats["batches"] += 1
+            stats["items"] += size
+            stats["failed_batches"] += int(failed)
+            stats["max_batch_size_seen"] = max(stats["max_batch_size_seen"], size)
+            stats["total_queue_wait"] += sum(waits)
+            stats["max_queue_wait"] = max(stats["max_queue_wait"], max(waits))
+            stats["batch_size_counts"][size] = stats["batch_size_counts"].get(size, 0) + 1
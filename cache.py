@@ -0,0 +1,179 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes a document for cache keys: Unicode NFC and collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def document_hash(text: str, exact: bool = False) -> str:
+    """
+    Returns the SHA-256 hex digest of a document.
+    With exact=True the raw text is hashed, which is needed for results that
+    carry character offsets into the text.
+    """
+    if not exact:
+        text = normalize_text(text)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    A content-addressed, two-tier cache for analysis results.
+
+    The first tier is a bounded in-process LRU. The second tier is an optional SQLite
+    database that survives restarts and can be shared by several worker processes.
+    """
+    def __init__(self, path: str = None, max_memory_entries: int = 256):
+        self.path = None
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "writes": 0}
+
+        if path:
+            self.open(path)
+
+    def open(self, path: str):
+        """
+        Opens the SQLite file of the persistent tier, creating it if needed.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        # WAL lets several worker processes read while one writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, doc_hash TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS results_doc_hash ON results (doc_hash)")
+        with self._lock:
+            self.path, self._conn = path, conn
+
+    @staticmethod
+    def make_key(method: str, doc_hash: str, params: dict) -> str:
+        payload = json.dumps({"method": method, "doc": doc_hash, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        Returns (found, value) for a key, promoting disk hits into the memory tier.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return True, self._memory[key][1]
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT doc_hash, value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[1])
+                    self._remember(key, row[0], value)
+                    self.stats["disk_hits"] += 1
+                    return True, value
+
+            self.stats["misses"] += 1
+            return False, None
+
+    def set(self, key: str, doc_hash: str, value):
+        with self._lock:
+            self._remember(key, doc_hash, value)
+            self.stats["writes"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, doc_hash, value, created_at) VALUES (?, ?, ?, ?)",
+                    (key, doc_hash, json.dumps(value), time.time()),
+                )
+
+    def invalidate(self, text: str = None) -> int:
+        """
+        Removes the cached results for one document, or everything if no text is given.
+        Returns the number of entries removed from the persistent tier (or memory tier
+        when there is no persistent tier).
+        """
+        with self._lock:
+            if text is None:
+                removed = len(self._memory)
+                self._memory.clear()
+                if self._conn is not None:
+                    removed = self._conn.execute("DELETE FROM results").rowcount
+                return removed
+
+            doc_hashes = [document_hash(text), document_hash(text, exact=True)]
+            stale = [key for key, (doc_hash, _) in self._memory.items() if doc_hash in doc_hashes]
+            for key in stale:
+                del self._memory[key]
+            removed = len(stale)
+            if self._conn is not None:
+                removed = self._conn.execute(
+                    "DELETE FROM results WHERE doc_hash IN (?, ?)", doc_hashes
+                ).rowcount
+            return removed
+
+    def info(self):
+        with self._lock:
+            info = dict(self.stats)
+            info["memory_entries"] = len(self._memory)
+            info["memory_capacity"] = self.max_memory_entries
+            if self._conn is not None:
+                info["disk_entries"] = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                info["path"] = self.path
+        return info
+
+    def _remember(self, key: str, doc_hash: str, value):
+        self._memory[key] = (doc_hash, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+
+def cached(model_attrs, exact_text: bool = False, ignore=("batch_size",)):
+    """
+    Decorator for LegalAnalyzer methods whose first argument is the document text.
+
+    The key covers the document hash, the method name, the model ids named in
+    `model_attrs` and every other argument (defaults included) except those in
+    `ignore`. Methods are only cached when the instance has a `cache` attribute set.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, text, *args, **kwargs):
+            cache = getattr(self, "cache", None)
+            if cache is None:
+                return method(self, text, *args, **kwargs)
+
+            bound = signature.bind(self, text, *args, **kwargs)
+            bound.apply_defaults()
+            params = {
+                name: value for name, value in bound.arguments.items()
+                if name not in ("self", "text") and name not in ignore
+            }
+            params["models"] = {attr: getattr(self, attr, None) for attr in model_attrs}
+            doc_hash = document_hash(text, exact=exact_text)
+            key = cache.make_key(method.__name__, doc_hash, params)
+
+            found, value = cache.get(key)
+            if found:
+                return value
+            value = method(self, text, *args, **kwargs)
+            cache.set(key, doc_hash, value)
+            return value
+
+        return wrapper
+    return decorator
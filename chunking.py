@@ -0,0 +1,100 @@
+import bisect
+import re
+
+# Characters tokenized per call; the unfinished tail of a block is carried into the next one
+BLOCK_CHARS = 100_000
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;])\s+")
+
+
+def cut_at_whitespace(text: str, position: int, max_chars: int) -> int:
+    """
+    Returns where to end a piece of text that starts at `position` and holds at most
+    max_chars characters: the last whitespace before the limit, so no word is split.
+    """
+    end = position + max_chars
+    if end >= len(text):
+        return len(text)
+    cut = max(text.rfind(" ", position, end), text.rfind("\n", position, end))
+    return cut if cut > position else end
+
+
+def _tokenize_block(text: str, start: int, end: int, tokenizer):
+    """
+    Tokenizes text[start:end] and returns the document-level character offsets of its
+    tokens, plus the indices of tokens that start a word and that start a sentence.
+    """
+    block = text[start:end]
+    encoded = tokenizer(block, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+    offsets = [(start + token_start, start + token_end) for token_start, token_end in encoded["offset_mapping"]]
+    sentence_offsets = {start + match.end() for match in SENTENCE_BOUNDARY.finditer(block)}
+
+    word_starts, sentence_starts = [], []
+    for i, (token_start, _) in enumerate(offsets):
+        if i == 0 or token_start > offsets[i - 1][1]:
+            word_starts.append(i)
+            if token_start in sentence_offsets:
+                sentence_starts.append(i)
+    return offsets, word_starts, sentence_starts
+
+
+def _last_before(indices, upper: int, lower: int):
+    """
+    Returns the largest index in the sorted list with lower < index <= upper, or None.
+    """
+    position = bisect.bisect_right(indices, upper) - 1
+    if position >= 0 and indices[position] > lower:
+        return indices[position]
+    return None
+
+
+def iter_token_chunks(text: str, tokenizer, max_tokens: int, overlap: int = 0, block_chars: int = BLOCK_CHARS):
+    """
+    Lazily splits a document into chunks of at most `max_tokens` model tokens.
+    Yields (start_char, end_char, num_tokens) for each chunk.
+
+    The text is tokenized once, a block at a time, with the fast tokenizer's offset
+    mapping. Chunks end at the last sentence boundary that keeps them at least half
+    full, otherwise at the last word boundary, and consecutive chunks share about
+    `overlap` tokens. Chunks always start and end on whole words, so re-tokenizing a
+    chunk on its own gives the same tokens. Only one block of offsets is held at a time.
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens.")
+
+    position = 0
+    while position < len(text):
+        block_end = cut_at_whitespace(text, position, block_chars)
+        offsets, word_starts, sentence_starts = _tokenize_block(text, position, block_end, tokenizer)
+        final_block = block_end >= len(text)
+        if not offsets:
+            position = block_end
+            continue
+
+        s = 0
+        while s < len(offsets):
+            if not final_block and len(offsets) - s <= max_tokens:
+                # Not enough tokens left for a full chunk; continue with the next block
+                break
+            e = min(s + max_tokens, len(offsets))
+            if e < len(offsets):
+                cut = _last_before(sentence_starts, e, s + max(overlap, max_tokens // 2))
+                if cut is None:
+                    cut = _last_before(word_starts, e, s + overlap)
+                e = cut if cut is not None else e
+            yield offsets[s][0], offsets[e - 1][1], e - s
+
+            if e >= len(offsets):
+                s = len(offsets)
+                break
+            # Start the next chunk on the first word boundary inside the overlap
+            next_start = e
+            if overlap:
+                candidates = word_starts[bisect.bisect_left(word_starts, e - overlap):]
+                next_start = candidates[0] if candidates and candidates[0] < e else e
+            s = max(next_start, s + 1)
+
+        if s == 0 and not final_block:
+            # The block held less than one chunk of tokens; read a larger one
+            block_chars *= 2
+            continue
+        position = offsets[s][0] if s < len(offsets) else block_end
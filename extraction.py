@@ -0,0 +1,51 @@
+import os
+
+# Pages extracted per task when a PDF is split across processes
+PAGES_PER_TASK = 8
+
+
+# pdfplumber is imported where it is used, so text-only deployments of the API do not need it
+def count_pdf_pages(pdf_path) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_text_from_pdf(pdf_path, pages=None):
+    """
+    Extracts text from a single PDF file, handling potential errors.
+    `pages` optionally limits extraction to a range of page indices.
+    """
+    if not os.path.exists(pdf_path):
+        # print(f"Warning: PDF file not found at {pdf_path}")
+        return ""
+
+    import pdfplumber
+
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            selected = pdf.pages if pages is None else [pdf.pages[i] for i in pages]
+            # Collect the pages and join once instead of growing the string page by page
+            texts = [page.extract_text() for page in selected]
+        return "".join(page_text + "\n" for page_text in texts if page_text)
+    except Exception as e:
+        print(f"Error processing PDF {pdf_path}: {e}")
+        return "" # Return empty string if PDF is corrupt or unreadable
+
+
+def extract_text_from_pdf_parallel(pdf_path, executor, pages_per_task: int = PAGES_PER_TASK):
+    """
+    Extracts a PDF with its pages split into ranges that `executor` (a process pool)
+    extracts in parallel. The text is identical to extract_text_from_pdf.
+    """
+    try:
+        num_pages = count_pdf_pages(pdf_path)
+    except Exception as e:
+        print(f"Error processing PDF {pdf_path}: {e}")
+        return ""
+    if num_pages <= pages_per_task:
+        return extract_text_from_pdf(pdf_path)
+
+    ranges = [range(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+    return "".join(executor.map(extract_text_from_pdf, [pdf_path] * len(ranges), ranges))
@@ -0,0 +1,68 @@
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]+")
+
+
+def tfidf_matrix(texts):
+    """
+    Returns an L2-normalized TF-IDF matrix with one row per text (sublinear term
+    frequency, smoothed idf). Texts without terms get an all-zero row.
+    """
+    vocabulary = {}
+    rows, cols, counts = [], [], []
+    for row, text in enumerate(texts):
+        terms = {}
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            column = vocabulary.setdefault(token, len(vocabulary))
+            terms[column] = terms.get(column, 0) + 1
+        rows.extend([row] * len(terms))
+        cols.extend(terms.keys())
+        counts.extend(terms.values())
+
+    matrix = np.zeros((len(texts), max(len(vocabulary), 1)), dtype=np.float32)
+    matrix[rows, cols] = 1.0 + np.log(np.asarray(counts, dtype=np.float32))
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= np.log((1.0 + len(texts)) / (1.0 + document_frequency)) + 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def textrank_scores(texts, damping: float = 0.85, iterations: int = 50, tolerance: float = 1e-6):
+    """
+    Scores texts by TextRank: PageRank over the graph of TF-IDF cosine similarities.
+    Texts that share vocabulary with many others score highest.
+    """
+    if len(texts) < 2:
+        return np.ones(len(texts), dtype=np.float32)
+
+    vectors = tfidf_matrix(texts)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    # Texts with no similar neighbour link to every text uniformly
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight > 0, out_weight, 1.0), 1.0 / len(texts))
+
+    scores = np.full(len(texts), 1.0 / len(texts), dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1.0 - damping) / len(texts) + damping * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def select_within_budget(scores, costs, budget):
+    """
+    Picks items in decreasing score order while their total cost fits the budget, and
+    returns their indices in their original order. The best item is always kept.
+    """
+    selected, spent = [], 0
+    for i in np.argsort(-np.asarray(scores), kind="stable"):
+        if selected and spent + costs[i] > budget:
+            continue
+        selected.append(int(i))
+        spent += costs[i]
+    return sorted(selected)
@@ -0,0 +1,208 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the job queue is at capacity.
+    """
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full. Retry after {retry_after} seconds.")
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a running job when it has been cancelled by the client.
+    """
+
+
+class Job:
+    """
+    A single analysis job and its current status, progress and result.
+    """
+    def __init__(self, text: str, options: dict = None):
+        self.id = uuid.uuid4().hex
+        self.text = text
+        self.options = options or {}
+        self.status = "queued"
+        self.progress = 0.0
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+
+    def update_progress(self, stage: str, progress: float):
+        """
+        Records the stage being worked on. Raises JobCancelled if the job was cancelled,
+        so long-running analyses stop at the next stage boundary.
+        """
+        if self.cancel_requested:
+            raise JobCancelled()
+        self.stage = stage
+        self.progress = progress
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs analysis jobs on a fixed pool of worker threads behind a bounded queue.
+
+    `handler` is called as handler(text, job, **options) and its return value becomes
+    the job result. It should call job.update_progress(...) between stages.
+    """
+    def __init__(self, handler, num_workers: int = 2, max_queue_size: int = 16, max_finished_jobs: int = 1000):
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_finished_jobs = max_finished_jobs
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._recent_durations = []
+
+    def start(self):
+        """
+        Starts the worker threads. Safe to call more than once.
+        """
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self):
+        """
+        Signals the worker threads to exit once they finish their current job.
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(None)
+
+    def submit(self, text: str, **options) -> Job:
+        """
+        Queues a new job. Extra keyword options are passed on to the handler.
+        Raises QueueFullError when the queue is at capacity.
+        """
+        self.start()
+        job = Job(text, options)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFullError(self.estimate_retry_after())
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """
+        Cancels a queued or running job, or forgets a finished one.
+        Returns the job, or None if it does not exist.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status in ("queued", "running"):
+                job.cancel_requested = True
+                if job.status == "queued":
+                    job.status = "cancelled"
+                    job.finished_at = time.time()
+                    job.text = None
+            else:
+                del self._jobs[job_id]
+        return job
+
+    def estimate_retry_after(self) -> int:
+        """
+        Estimates how many seconds until a queue slot frees up.
+        """
+        if not self._recent_durations:
+            return 5
+        average = sum(self._recent_durations) / len(self._recent_durations)
+        return max(1, int(average / max(self.num_workers, 1)) + 1)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.num_workers,
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "jobs": counts,
+        }
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job):
+        with self._lock:
+            if job.cancel_requested:
+                return
+            job.status = "running"
+            job.started_at = time.time()
+
+        try:
+            result = self.handler(job.text, job, **job.options)
+            job.result = result
+            job.progress = 1.0
+            job.status = "completed"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"[Jobs] Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            # The document text is no longer needed once the job is done
+            job.text = None
+            self._record_duration(job.finished_at - job.started_at)
+            self._prune_finished()
+
+    def _record_duration(self, duration: float):
+        with self._lock:
+            self._recent_durations.append(duration)
+            del self._recent_durations[:-20]
+
+    def _prune_finished(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+            for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+                del self._jobs[job_id]
@@ -1,76 +1,738 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from .models import LegalAnalyzer
-
-# Create an instance of the FastAPI application
-app = FastAPI(
-    title="Legal Document Analysis API",
-    description="An API that uses open-source LLMs to analyze legal text.",
-    version="1.0.0"
-)
-
-# Initialize the analyzer. This loads the models into memory and happens only once at startup.
-try:
-    analyzer = LegalAnalyzer()
-except Exception as e:
-    # If model loading fails, the server should not start correctly.
-    raise RuntimeError(f"Failed to initialize LegalAnalyzer: {e}")
-
-
-# Define the data model for the incoming request body
-class Document(BaseModel):
-    text: str
-    class Config:
-        schema_extra = {
-            "example": {
-                "text": "This Agreement is made between Party A and Party B. "
-                        "The term of this agreement is for five years. "
-                        "Party A shall not be liable for any breach of contract..."
-            }
-        }
-
-
-@app.get("/", tags=["General"])
-def read_root():
-    """ A welcome message to verify the API is running. """
-    return {"message": "Welcome to the Legal LLM Analysis API. Go to /docs for documentation."}
-
-
-@app.post("/analyze", tags=["Analysis"])
-def analyze_document(doc: Document):
-    """
-    Analyzes a legal document to perform risk assessment, summarization, and clause extraction.
-    """
-    if not doc.text or not doc.text.strip():
-        raise HTTPException(status_code=400, detail="Document text cannot be empty.")
-    
-    try:
-        print("\n[API] Received request. Starting analysis...")
-
-        # 1. Perform risk analysis
-        print("[API] Analyzing risk...")
-        risk = analyzer.analyze_risk(doc.text)
-        print(f"[API] Risk assessment complete: {risk}")
-
-        # 2. Extract clauses and entities
-        print("[API] Extracting clauses...")
-        clauses = analyzer.extract_clauses(doc.text)
-        print(f"[API] Clause extraction complete. Found {len(clauses)} entities.")
-        
-        # 3. Generate summary
-        print("[API] Generating summary...")
-        summary = analyzer.summarize_document(doc.text)
-        print("[API] Summary generation complete.")
-
-        print("[API] Analysis finished. Returning results.")
-        
-        return {
-            "summary": summary,
-            "risk_assessment": risk,
-            "extracted_clauses": clauses,
-        }
-
-    except Exception as e:
-        # A general catch-all for any unexpected errors during analysis
-        print(f"[API] An unexpected error occurred: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+import contextvars
+import gzip
+import importlib.util
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Literal
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from .extraction import extract_text_from_pdf_parallel
+from .models import LegalAnalyzer
+from .jobs import JobManager, QueueFullError
+from .cache import ResultCache
+from .worker_pool import PooledAnalyzer
+from .search import SearchIndex
+from .versioning import VersionStore, analyze_revision, diff_revisions
+from .metrics import (
+    DOCUMENT_CHARS, JOBS, REQUESTS_IN_FLIGHT, REQUESTS_TOTAL,
+    profile_var, render_metrics, request_id_var, span,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Encodes the response with orjson when it is installed, which is several times faster
+    than the standard json module on large entity lists.
+    """
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Create an instance of the FastAPI application
+app = FastAPI(
+    title="Legal Document Analysis API",
+    description="An API that uses open-source LLMs to analyze legal text.",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+)
+
+# Results are cached by document content in memory and in a SQLite file shared by all workers.
+# The file is opened at startup, so importing this module writes nothing. Set RESULT_CACHE_PATH
+# to an empty string to keep the cache in memory only.
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH", "data/cache/results.sqlite3")
+result_cache = ResultCache(max_memory_entries=int(os.environ.get("RESULT_CACHE_MEMORY_ENTRIES", 256)))
+
+# Initialize the analyzer. Models are loaded lazily on first use, or ahead of time by the
+# warm-up that runs at startup, so importing this module stays cheap.
+try:
+    analyzer = LegalAnalyzer(
+        cache=result_cache,
+        risk_lexicon_path=os.environ.get("RISK_LEXICON_PATH"),
+        # Chunks from concurrent requests share model batches
+        micro_batching=os.environ.get("MICRO_BATCHING", "1") == "1",
+        max_batch_size=int(os.environ.get("MAX_BATCH_SIZE", 16)),
+        max_wait_ms=float(os.environ.get("MAX_BATCH_WAIT_MS", 10)),
+        # "pytorch" (fp32), "int8" (dynamic quantization) or "onnx" (ONNX Runtime)
+        backend=os.environ.get("MODEL_BACKEND", "pytorch"),
+        # A smaller model with the same vocabulary (e.g. t5-small) speeds up summarization
+        draft_model_path=os.environ.get("DRAFT_MODEL") or None,
+    )
+except Exception as e:
+    # If the analyzer cannot be configured, the server should not start correctly.
+    raise RuntimeError(f"Failed to initialize LegalAnalyzer: {e}")
+
+# With MODEL_WORKERS > 0 the models are loaded once in this process and inference runs on
+# that many forked workers sharing the weights. Run a single uvicorn worker in this mode.
+# SPARE_MODEL_WORKERS more are forked at startup to replace workers that die.
+MODEL_WORKERS = int(os.environ.get("MODEL_WORKERS", 0))
+if MODEL_WORKERS > 0:
+    threads_per_worker = os.environ.get("THREADS_PER_WORKER")
+    analyzer = PooledAnalyzer(
+        analyzer,
+        num_workers=MODEL_WORKERS,
+        threads_per_worker=int(threads_per_worker) if threads_per_worker else None,
+        spare_workers=int(os.environ.get("SPARE_MODEL_WORKERS", 1)),
+    )
+
+
+# Define the data model for the incoming request body
+ALL_TASKS = ["risk", "clauses", "summary"]
+
+
+class SummaryBudget(BaseModel):
+    # Input tokens and/or seconds to spend on summarization; only the most salient chunks are summarized
+    tokens: int = None
+    seconds: float = None
+    # Summarize the selected chunk summaries once more
+    reduce: bool = False
+
+
+class Document(BaseModel):
+    # Empty text is rejected by validation (422); whitespace-only text by the endpoints (400)
+    text: str = Field(..., min_length=1)
+    # Only the requested tasks are run, and only their models are loaded
+    tasks: List[Literal["risk", "clauses", "summary"]] = ALL_TASKS
+    # Adds a per-stage timing breakdown to the response
+    profile: bool = False
+    summary_budget: SummaryBudget = None
+    # "columnar" returns extracted_clauses as one list per field, which is much smaller
+    entity_format: Literal["records", "columnar"] = "records"
+    class Config:
+        schema_extra = {
+            "example": {
+                "text": "This Agreement is made between Party A and Party B. "
+                        "The term of this agreement is for five years. "
+                        "Party A shall not be liable for any breach of contract...",
+                "tasks": ALL_TASKS,
+            }
+        }
+
+
+# Comma-separated tasks whose models are loaded in the background at startup. Empty disables warm-up.
+WARMUP_TASKS = [task for task in os.environ.get("WARMUP_TASKS", "clauses,summary").split(",") if task]
+readiness = {"ready": not WARMUP_TASKS, "error": None}
+
+
+def warm_up_models():
+    try:
+        analyzer.warm_up(WARMUP_TASKS)
+        readiness["ready"] = True
+    except Exception as e:
+        print(f"[API] Model warm-up failed: {e}")
+        readiness["error"] = str(e)
+
+
+@app.get("/", tags=["General"])
+def read_root():
+    """ A simple health check to verify the API is running. """
+    return {"status": "ok", "message": "Legal LLM API is running!"}
+
+
+@app.get("/healthz", tags=["General"])
+def healthz():
+    """ Liveness probe: the process is up and serving requests. """
+    return {"status": "ok"}
+
+
+@app.get("/readyz", tags=["General"])
+def readyz():
+    """ Readiness probe: the startup warm-up has finished loading the configured models. """
+    body = {"status": "ready" if readiness["ready"] else "loading", "models": analyzer.loaded_models()}
+    if readiness["error"]:
+        body["status"] = "error"
+        body["error"] = readiness["error"]
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=body)
+
+
+# Relative cost of each stage, used for job progress
+STAGE_WEIGHTS = {"risk": 0.05, "clauses": 0.15, "summary": 0.8}
+
+# The stages of one request run concurrently on this pool; torch releases the GIL during
+# inference. Set STAGE_CONCURRENCY=0 to run them one after another.
+stage_executor = (
+    ThreadPoolExecutor(max_workers=int(os.environ.get("STAGE_WORKERS", 8)), thread_name_prefix="analysis-stage")
+    if os.environ.get("STAGE_CONCURRENCY", "1") == "1" else None
+)
+
+if stage_executor is not None and MODEL_WORKERS == 0:
+    # Split the intra-op threads between NER and T5 so concurrent stages do not
+    # oversubscribe the cores. Generation dominates, so it gets the larger share.
+    cpu_count = os.cpu_count() or 1
+    ner_threads = max(1, cpu_count // 3)
+    analyzer.set_thread_split(ner_threads=ner_threads, summarization_threads=max(1, cpu_count - ner_threads))
+
+
+def run_stage(stage: str, text: str, summary_budget=None):
+    """
+    Runs a single analysis stage and returns its part of the response.
+    """
+    with span(stage):
+        if stage == "risk":
+            risk_report = analyzer.assess_risk(text)
+            print(f"[API] Risk assessment complete: {risk_report['label']}")
+            return {
+                "risk_assessment": risk_report["label"],
+                "risk_score": risk_report["score"],
+                "risky_clauses": risk_report["clauses"],
+            }
+
+        if stage == "clauses":
+            extracted_clauses = analyzer.extract_clauses(text)
+            print(f"[API] Clause extraction complete. Found {len(extracted_clauses)} entities.")
+            return {"extracted_clauses": extracted_clauses}
+
+        if summary_budget:
+            summary = analyzer.summarize_document(
+                text,
+                token_budget=summary_budget.get("tokens"),
+                time_budget=summary_budget.get("seconds"),
+                reduce=summary_budget.get("reduce", False),
+            )
+        else:
+            summary = analyzer.summarize_document(text)
+        print("[API] Summary generation complete.")
+        return {"summary": summary}
+
+
+def run_analysis(text: str, job=None, tasks=ALL_TASKS, summary_budget=None):
+    """
+    Runs the requested tasks (risk assessment, clause extraction, summarization) on a document.
+    The stages are independent and run concurrently; the result keeps the stage order.
+    If a job is given, its progress is updated as stages finish. summary_budget is a dict
+    with optional "tokens", "seconds" and "reduce" that bounds the cost of the summary.
+    """
+    def report(stage, progress):
+        if job is not None:
+            job.update_progress(stage, progress)
+
+    if job is not None:
+        # Job workers run outside any request, so their log lines are tagged with the job id
+        request_id_var.set(job.id)
+
+    stages = [stage for stage in ALL_TASKS if stage in tasks]
+    total_weight = sum(STAGE_WEIGHTS[stage] for stage in stages) or 1.0
+    parts = {}
+    DOCUMENT_CHARS.observe(len(text))
+    with span("analysis", chars=len(text), tasks=stages):
+        report(", ".join(stages), 0.0)
+        if stage_executor is None:
+            for i, stage in enumerate(stages):
+                parts[stage] = run_stage(stage, text, summary_budget)
+                report(", ".join(stages[i + 1:]) or "done", sum(STAGE_WEIGHTS[s] for s in parts) / total_weight)
+        else:
+            # Each stage runs in a copy of this context, so it keeps the request id and profile
+            futures = {
+                stage_executor.submit(contextvars.copy_context().run, run_stage, stage, text, summary_budget): stage
+                for stage in stages
+            }
+            try:
+                for future in as_completed(futures):
+                    parts[futures[future]] = future.result()
+                    running = [stage for stage in stages if stage not in parts]
+                    report(", ".join(running) or "done", sum(STAGE_WEIGHTS[s] for s in parts) / total_weight)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    result = {}
+    for stage in stages:
+        result.update(parts[stage])
+    return result
+
+
+def budget_options(doc: Document):
+    return doc.summary_budget.dict() if doc.summary_budget else None
+
+
+# The fields of an extracted entity, in the order merge_entity_pieces creates them
+ENTITY_FIELDS = ("entity", "score", "word", "start", "end")
+
+
+def columnar_entities(entities):
+    """
+    Converts a list of entity dicts into one list per field, so the field names are sent
+    once instead of once per entity. The columns are the same whether or not any entity
+    was found.
+    """
+    return {field: [entity.get(field) for entity in entities] for field in ENTITY_FIELDS}
+
+
+def format_result(result, entity_format: str = "records"):
+    if entity_format == "columnar" and "extracted_clauses" in result:
+        result["extracted_clauses"] = columnar_entities(result["extracted_clauses"])
+    return result
+
+
+# Long analyses run as background jobs on a fixed pool of workers behind a bounded queue.
+job_manager = JobManager(
+    handler=run_analysis,
+    num_workers=int(os.environ.get("JOB_WORKERS", 2)),
+    max_queue_size=int(os.environ.get("JOB_QUEUE_SIZE", 16)),
+)
+
+
+def route_label(request: Request) -> str:
+    """
+    Returns the path template of the route a request is for (e.g. /jobs/{job_id}), so the
+    metrics have one series per endpoint instead of one per job or document id.
+    """
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match != Match.NONE:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    """
+    Tags the request with an id (taken from X-Request-ID or generated), which every timing
+    log line carries, and counts requests per endpoint and status code.
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    endpoint = route_label(request)
+    REQUESTS_IN_FLIGHT.inc(endpoint=endpoint)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+        REQUESTS_TOTAL.inc(endpoint=endpoint, status=status)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+# JSON responses at least this large are gzip-compressed for clients that accept it
+GZIP_MIN_BYTES = int(os.environ.get("GZIP_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 5))
+
+
+@app.middleware("http")
+async def compress_json(request: Request, call_next):
+    """
+    Gzips JSON responses. Streamed NDJSON is left alone so records still arrive as they are produced.
+    """
+    response = await call_next(request)
+    if (
+        "gzip" not in request.headers.get("accept-encoding", "")
+        or not response.headers.get("content-type", "").startswith("application/json")
+        or "content-encoding" in response.headers
+    ):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    if len(body) >= GZIP_MIN_BYTES:
+        # Compress off the event loop; large analyses produce several megabytes of JSON
+        body = await run_in_threadpool(gzip.compress, body, GZIP_LEVEL)
+        headers["content-encoding"] = "gzip"
+        headers["vary"] = "Accept-Encoding"
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+@app.on_event("startup")
+def open_stores():
+    if RESULT_CACHE_PATH:
+        result_cache.open(RESULT_CACHE_PATH)
+    if VERSION_STORE_PATH:
+        version_store.open(VERSION_STORE_PATH)
+
+
+@app.on_event("startup")
+def start_job_workers():
+    job_manager.start()
+    if WARMUP_TASKS:
+        # Warm up in the background so liveness probes pass while the models load
+        threading.Thread(target=warm_up_models, name="model-warm-up", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_manager.stop()
+    if MODEL_WORKERS > 0:
+        analyzer.pool.stop()
+    if pdf_executor is not None:
+        pdf_executor.shutdown(cancel_futures=True)
+
+
+@app.post("/analyze", tags=["Analysis"])
+def analyze_document(doc: Document):
+    """
+    Analyzes a legal document to perform risk assessment, summarization, and clause extraction.
+    """
+    if not doc.text or not doc.text.strip():
+        raise HTTPException(status_code=400, detail="Document text cannot be empty.")
+    
+    try:
+        print("\n[API] Received request. Starting analysis...")
+        profile = [] if doc.profile else None
+        profile_var.set(profile)
+        result = run_analysis(doc.text, tasks=doc.tasks, summary_budget=budget_options(doc))
+        if profile is not None:
+            result["profile"] = profile
+        print("[API] Analysis finished. Returning results.")
+        # Returned directly so the result is encoded once, without jsonable_encoder
+        return FastJSONResponse(format_result(result, doc.entity_format))
+
+    except Exception as e:
+        # A general catch-all for any unexpected errors during analysis
+        print(f"[API] An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Uploads are streamed to a temporary file (in UPLOAD_DIR, or the system default) instead of memory
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR") or None
+MAX_UPLOAD_MB = float(os.environ.get("MAX_UPLOAD_MB", 50))
+UPLOAD_TYPES = (".pdf", ".txt")
+
+# The pages of an uploaded PDF are extracted in parallel by this many processes, started on first upload
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+pdf_executor = None
+pdf_executor_lock = threading.Lock()
+
+
+def get_pdf_executor():
+    global pdf_executor
+    with pdf_executor_lock:
+        if pdf_executor is None:
+            # Spawned rather than forked, so the workers do not inherit the loaded models
+            pdf_executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return pdf_executor
+
+
+def save_upload(upload: UploadFile, suffix: str) -> str:
+    """
+    Copies the upload to a temporary file block by block and returns its path.
+    Raises a 413 once the upload exceeds MAX_UPLOAD_MB.
+    """
+    max_bytes = int(MAX_UPLOAD_MB * 1024 * 1024)
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=UPLOAD_DIR) as f:
+        try:
+            while True:
+                block = upload.file.read(1024 * 1024)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Uploads are limited to {MAX_UPLOAD_MB:g} MB.")
+                f.write(block)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    return f.name
+
+
+def extract_upload_text(path: str, suffix: str) -> str:
+    if suffix == ".pdf":
+        if importlib.util.find_spec("pdfplumber") is None:
+            raise HTTPException(status_code=501, detail="PDF uploads need pdfplumber, which is not installed.")
+        return extract_text_from_pdf_parallel(path, get_pdf_executor())
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+@app.post("/analyze/upload", tags=["Analysis"])
+def analyze_upload(
+    file: UploadFile = File(..., description="A .pdf or .txt contract."),
+    tasks: str = Form(",".join(ALL_TASKS), description="Comma-separated tasks to run."),
+    entity_format: Literal["records", "columnar"] = Form("records"),
+    include_text: bool = Form(False, description="Also return the extracted text."),
+):
+    """
+    Analyzes an uploaded PDF or text file. PDF pages are extracted in parallel.
+    """
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    if suffix not in UPLOAD_TYPES:
+        raise HTTPException(status_code=415, detail=f"Only {', '.join(UPLOAD_TYPES)} files are supported.")
+    requested = [task.strip() for task in tasks.split(",") if task.strip()]
+    unknown = [task for task in requested if task not in ALL_TASKS]
+    if unknown or not requested:
+        raise HTTPException(status_code=422, detail=f"Tasks must be a comma-separated subset of {', '.join(ALL_TASKS)}.")
+
+    path = save_upload(file, suffix)
+    try:
+        with span("extract", format=suffix[1:], bytes=os.path.getsize(path)) as fields:
+            text = extract_upload_text(path, suffix)
+            fields["chars"] = len(text)
+    finally:
+        os.remove(path)
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="No text could be extracted from the file.")
+
+    try:
+        print(f"\n[API] Received upload {file.filename}. Starting analysis...")
+        result = format_result(run_analysis(text, tasks=requested), entity_format)
+        if include_text:
+            result["text"] = text
+        print("[API] Analysis finished. Returning results.")
+        return FastJSONResponse(result)
+    except Exception as e:
+        print(f"[API] An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def stream_analysis(text: str, tasks=ALL_TASKS):
+    """
+    Yields the analysis as newline-delimited JSON records as soon as each part is ready:
+    the risk result, the entities of each chunk, each chunk summary, then a final record.
+    """
+    def record(payload):
+        return json.dumps(payload) + "\n"
+
+    try:
+        complete = {"type": "complete"}
+        if "risk" in tasks:
+            risk_report = analyzer.assess_risk(text)
+            complete["risk_assessment"] = risk_report["label"]
+            yield record({
+                "type": "risk",
+                "risk_assessment": risk_report["label"],
+                "risk_score": risk_report["score"],
+                "risky_clauses": risk_report["clauses"],
+            })
+
+        if "clauses" in tasks:
+            entity_count = 0
+            for chunk_index, entities in analyzer.iter_clauses(text):
+                entity_count += len(entities)
+                yield record({"type": "entities", "chunk": chunk_index, "entities": entities})
+            complete["entity_count"] = entity_count
+
+        if "summary" in tasks:
+            # The token counts from chunking are passed on, so the chunks are not tokenized twice
+            chunks, token_lengths = [], []
+            for chunk, num_tokens in analyzer.iter_summary_chunks(text):
+                chunks.append(chunk)
+                token_lengths.append(num_tokens)
+            summaries = [""] * len(chunks)
+            for chunk_index, summary in analyzer.iter_chunk_summaries(chunks, token_lengths=token_lengths):
+                summaries[chunk_index] = summary
+                yield record({"type": "summary", "chunk": chunk_index, "total_chunks": len(chunks), "summary": summary})
+            complete["summary"] = " ".join(summary for summary in summaries if summary).strip()
+
+        yield record(complete)
+    except Exception as e:
+        # The status code has already been sent, so errors are reported in-band
+        print(f"[API] An unexpected error occurred while streaming: {e}")
+        yield record({"type": "error", "detail": str(e)})
+
+
+@app.post("/analyze/stream", tags=["Analysis"])
+def analyze_document_stream(doc: Document):
+    """
+    Streams the analysis of a legal document as NDJSON, one record per line.
+    """
+    if not doc.text or not doc.text.strip():
+        raise HTTPException(status_code=400, detail="Document text cannot be empty.")
+
+    print("\n[API] Received streaming request. Starting analysis...")
+    return StreamingResponse(stream_analysis(doc.text, doc.tasks), media_type="application/x-ndjson")
+
+
+@app.post("/jobs", status_code=202, tags=["Jobs"])
+def create_job(doc: Document):
+    """
+    Queues a document for analysis and returns a job id right away.
+    Returns 429 with a Retry-After header when the job queue is full.
+    """
+    if not doc.text or not doc.text.strip():
+        raise HTTPException(status_code=400, detail="Document text cannot be empty.")
+
+    try:
+        job = job_manager.submit(doc.text, tasks=doc.tasks, summary_budget=budget_options(doc))
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e)},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    print(f"[API] Queued job {job.id}.")
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}", tags=["Jobs"])
+def get_job(job_id: str):
+    """
+    Returns the status, progress and (once completed) the result of a job.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return FastJSONResponse(job.to_dict())
+
+
+@app.delete("/jobs/{job_id}", tags=["Jobs"])
+def delete_job(job_id: str):
+    """
+    Cancels a queued or running job, or removes a finished one.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {"job_id": job.id, "status": job.status}
+
+
+# Every analyzed version of a document is kept with its per-chunk results, so a revision only
+# re-analyzes the chunks it changed. The SQLite file is opened at startup, like the result cache.
+# Set VERSION_STORE_PATH to an empty string to keep the versions in memory.
+VERSION_STORE_PATH = os.environ.get("VERSION_STORE_PATH", "data/versions/versions.sqlite3")
+version_store = VersionStore()
+
+
+class Revision(BaseModel):
+    text: str
+    tasks: List[Literal["risk", "clauses", "summary"]] = ALL_TASKS
+    # Version whose results are reused and diffed against; the latest version by default
+    base_version: int = None
+
+
+@app.post("/documents/{doc_id}/versions", tags=["Versions"])
+def add_document_version(doc_id: str, revision: Revision):
+    """
+    Analyzes a new version of a document. Chunks unchanged since the base version reuse
+    their entities and summaries; the response includes a diff against that version.
+    """
+    if not revision.text or not revision.text.strip():
+        raise HTTPException(status_code=400, detail="Document text cannot be empty.")
+    previous = version_store.get(doc_id, revision.base_version)
+    if revision.base_version is not None and previous is None:
+        raise HTTPException(status_code=404, detail="Base version not found.")
+
+    try:
+        print(f"\n[API] Received version of document {doc_id}. Starting analysis...")
+        DOCUMENT_CHARS.observe(len(revision.text))
+        with span("revision", chars=len(revision.text)) as fields:
+            record, stats = analyze_revision(analyzer, revision.text, previous, revision.tasks)
+            fields.update(stats)
+        version = version_store.add(doc_id, record)
+        print(f"[API] Stored version {version} of document {doc_id}.")
+        return FastJSONResponse({
+            "doc_id": doc_id,
+            "version": version,
+            "result": record["result"],
+            "reuse": stats,
+            "diff": diff_revisions(previous, record) if previous is not None else None,
+        })
+    except Exception as e:
+        print(f"[API] An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/documents/{doc_id}/versions", tags=["Versions"])
+def list_document_versions(doc_id: str):
+    """
+    Lists the stored versions of a document.
+    """
+    return {"doc_id": doc_id, "versions": version_store.versions(doc_id)}
+
+
+@app.get("/documents/{doc_id}/versions/{version}", tags=["Versions"])
+def get_document_version(doc_id: str, version: int, diff: bool = False):
+    """
+    Returns the result of a stored version and, with diff=true, its diff against the
+    version it was analyzed against.
+    """
+    record = version_store.get(doc_id, version)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Version not found.")
+    body = {"doc_id": doc_id, "version": version, "base_version": record.get("base_version"), "result": record["result"]}
+    if diff:
+        base_version = record.get("base_version")
+        previous = version_store.get(doc_id, base_version) if base_version is not None else None
+        body["diff"] = diff_revisions(previous, record) if previous is not None else None
+    return FastJSONResponse(body)
+
+
+# Built offline by scripts/build_search_index.py and opened (memory-mapped) on first search
+SEARCH_INDEX_DIR = os.environ.get("SEARCH_INDEX_DIR", "data/search_index")
+search_index = None
+search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    global search_index
+    with search_index_lock:
+        if search_index is None:
+            if not os.path.exists(os.path.join(SEARCH_INDEX_DIR, "meta.json")):
+                raise HTTPException(status_code=503, detail="The search index has not been built.")
+            search_index = SearchIndex(SEARCH_INDEX_DIR)
+        return search_index
+
+
+@app.get("/search", tags=["Search"])
+def search_clauses(
+    q: str,
+    k: int = Query(10, ge=1, le=100),
+    risk: List[str] = Query(None, description="Keep only documents with these risk assessments, e.g. 'High Risk'."),
+    entity_type: List[str] = Query(None, description="Keep only chunks with entities of these types, e.g. 'ORG'."),
+):
+    """
+    Searches the clauses of all analyzed contracts and returns the k best matching chunks.
+    """
+    index = get_search_index()
+    with span("search", k=k) as fields:
+        results = index.search(q, k=k, risk_levels=risk, entity_types=entity_type)
+        fields["results"] = len(results)
+    return {"query": q, "results": results}
+
+
+@app.get("/metrics", tags=["Admin"])
+def get_metrics():
+    """
+    Exposes stage latencies, document sizes, model load times and request and job counts
+    in the Prometheus text format.
+    """
+    counts = job_manager.stats()["jobs"]
+    for status in ("queued", "running", "completed", "failed", "cancelled"):
+        JOBS.set(counts.get(status, 0), status=status)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/batching", tags=["Admin"])
+def get_batching_stats():
+    """
+    Returns batch-size and queue-wait statistics of the micro-batching scheduler.
+    """
+    return analyzer.batching_stats()
+
+
+class CacheInvalidation(BaseModel):
+    text: str = None
+
+
+@app.get("/admin/cache", tags=["Admin"])
+def get_cache_stats():
+    """
+    Returns hit, miss and eviction counters for the result cache.
+    """
+    return result_cache.info()
+
+
+@app.post("/admin/cache/invalidate", tags=["Admin"])
+def invalidate_cache(request: CacheInvalidation):
+    """
+    Removes cached results for the given document text, or all results if no text is given.
+    """
+    removed = result_cache.invalidate(request.text)
+    print(f"[API] Invalidated {removed} cached results.")
+    return {"removed": removed}
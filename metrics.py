@@ -0,0 +1,160 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# The request id and (optional) stage profile of the request being handled
+request_id_var = contextvars.ContextVar("request_id", default=None)
+profile_var = contextvars.ContextVar("profile", default=None)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_value(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + [float("inf")], counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': le})} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram(
+    "legal_analyzer_stage_seconds", "Latency of each analysis stage and chunk-level model call.",
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300],
+    labelnames=("stage",),
+)
+DOCUMENT_CHARS = Histogram(
+    "legal_analyzer_document_chars", "Size of analyzed documents in characters.",
+    buckets=[1e3, 5e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6],
+)
+DOCUMENT_CHUNKS = Histogram(
+    "legal_analyzer_document_chunks", "Number of model chunks per document.",
+    buckets=[1, 2, 5, 10, 20, 50, 100, 200, 500, 1000],
+    labelnames=("task",),
+)
+CHUNK_TOKENS = Histogram(
+    "legal_analyzer_chunk_tokens", "Number of model input tokens per chunk.",
+    buckets=[16, 32, 64, 128, 256, 384, 512, 768, 1024],
+    labelnames=("task",),
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "legal_analyzer_model_load_seconds", "Time taken to load each model.", labelnames=("model",),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "legal_analyzer_requests_in_flight", "Requests currently being handled.", labelnames=("endpoint",),
+)
+REQUESTS_TOTAL = Counter(
+    "legal_analyzer_requests_total", "Handled requests by endpoint and status code.", labelnames=("endpoint", "status"),
+)
+JOBS = Gauge(
+    "legal_analyzer_jobs", "Background jobs by status.", labelnames=("status",),
+)
+
+
+def render_metrics() -> str:
+    """
+    Renders every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """
+    Times a block, records it in the stage latency histogram and logs one structured line
+    tagged with the current request id. If the request is being profiled, the span is
+    also added to its profile.
+    """
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        record = {"request_id": request_id_var.get(), "stage": stage, "ms": round(1000 * elapsed, 2)}
+        record.update(fields)
+        profile = profile_var.get()
+        if profile is not None:
+            profile.append(record)
+        print(f"[Timing] {json.dumps(record)}")
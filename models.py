@@ -1,102 +1,705 @@
-from transformers import pipeline
-import torch
-
-class LegalAnalyzer:
-    def __init__(self, ner_model_path="dslim/bert-base-NER", summarization_model_path="t5-base"):
-        """
-        Initializes the LegalAnalyzer with pre-trained models.
-        """
-        print("Loading models... This may take a moment.")
-        # Determine device (use GPU if available)
-        device = 0 if torch.cuda.is_available() else -1
-        
-        self.ner_pipeline = pipeline("ner", model=ner_model_path, device=device)
-        self.summarizer_pipeline = pipeline("summarization", model=summarization_model_path, device=device)
-        print("Models loaded successfully.")
-
-
-    def extract_clauses(self, text: str, chunk_size: int = 512):
-        """
-        Extracts named entities from a legal document by chunking it.
-        """
-        print("Extracting clauses by chunking document...")
-        tokens = text.split()
-        all_entities = []
-
-        # Process the text in overlapping chunks to maintain context at boundaries
-        for i in range(0, len(tokens), chunk_size - 50): # -50 for overlap
-            chunk = " ".join(tokens[i:i + chunk_size])
-            if not chunk:
-                continue
-
-            # Process with the NER pipeline
-            chunk_entities = self.ner_pipeline(chunk)
-            
-            # Sanitize the output to convert numpy types to standard python types
-            for entity in chunk_entities:
-                sanitized_entity = {
-                    # --- FIX: Changed 'entity_group' to 'entity' to match the model's output ---
-                    "entity": entity['entity'],
-                    "score": float(entity['score']), # Convert numpy.float32 to python float
-                    "word": entity['word'],
-                    "start": entity['start'],
-                    "end": entity['end'],
-                }
-                all_entities.append(sanitized_entity)
-
-        # Basic merging of entities - a more advanced implementation could improve this
-        # For now, we'll just return the unique entities found
-        unique_entities = [dict(t) for t in {tuple(d.items()) for d in all_entities}]
-        return unique_entities
-
-
-    def summarize_document(self, text: str, max_chunk_length: int = 1024): # Removed fixed max_summary_length
-        """
-        Generates a summary of a long legal document by summarizing chunks smartly.
-        """
-        print(f"Summarizing document by splitting into chunks...")
-        
-        # Split text into chunks that T5 can handle
-        chunks = [text[i:i + max_chunk_length] for i in range(0, len(text), max_chunk_length)]
-        full_summary = ""
-        
-        print(f"Summarizing {len(chunks)} chunks...")
-        for i, chunk in enumerate(chunks):
-            # --- FIX: Dynamic max_length ---
-            # For summarization, a good max_length is often about half the input length.
-            # We also set a reasonable floor and ceiling.
-            chunk_length = len(chunk.split()) # Get number of words in chunk
-            
-            # Set max_length to be half the chunk length, but no more than 150 and no less than 20.
-            dynamic_max_length = min(max(int(chunk_length / 2), 20), 150) 
-            # We also set a minimum length to be smaller.
-            dynamic_min_length = min(max(int(chunk_length / 4), 5), 30)
-
-            try:
-                # Use the new dynamic lengths in the pipeline call
-                summary = self.summarizer_pipeline(
-                    chunk, 
-                    max_length=dynamic_max_length, 
-                    min_length=dynamic_min_length, 
-                    do_sample=False
-                )
-                full_summary += summary[0]['summary_text'] + " "
-            except Exception as e:
-                print(f"Could not summarize chunk {i+1}. Error: {e}")
-
-        return full_summary.strip()
-
-    def analyze_risk(self, text: str) -> str:
-        """
-        Performs a simple keyword-based risk analysis.
-        """
-        risky_keywords = ["terminate", "indemnify", "liability", "breach", "default", "waive", "penalty"]
-        text_lower = text.lower()
-        risk_score = sum(1 for keyword in risky_keywords if keyword in text_lower)
-        
-        if risk_score > 3:
-            return "High Risk"
-        elif risk_score > 0:
-            return "Medium Risk"
-        else:
-            return "Low Risk"
\ No newline at end of file
+from transformers import pipeline
+import torch
+import collections
+import threading
+import time
+from .cache import cached
+from .risk import RiskEngine
+from .batching import MicroBatcher
+from .metrics import CHUNK_TOKENS, DOCUMENT_CHUNKS, MODEL_LOAD_SECONDS, span
+from .extractive import select_within_budget, textrank_scores
+from .chunking import iter_token_chunks
+from concurrent.futures import as_completed
+
+
+def merge_entity_pieces(pieces, text):
+    """
+    Merges token-level NER output (B-/I- tags and ## subword pieces) into whole spans.
+    Each piece must already carry document-level 'start' and 'end' offsets.
+    """
+    merged = []
+    for piece in sorted(pieces, key=lambda p: p['start']):
+        prefix, _, entity_type = piece['entity'].rpartition('-')
+        current = merged[-1] if merged else None
+        continues = (
+            current is not None
+            and current['entity'] == entity_type
+            and (prefix == 'I' or piece['word'].startswith('##'))
+            and not text[current['end']:piece['start']].strip()
+        )
+        if continues:
+            current['end'] = max(current['end'], piece['end'])
+            current['_scores'].append(piece['score'])
+        else:
+            merged.append({
+                "entity": entity_type,
+                "start": piece['start'],
+                "end": piece['end'],
+                "_scores": [piece['score']],
+            })
+
+    return [
+        {
+            "entity": span['entity'],
+            "score": sum(span['_scores']) / len(span['_scores']),
+            "word": text[span['start']:span['end']],
+            "start": span['start'],
+            "end": span['end'],
+        }
+        for span in merged
+    ]
+
+
+def dedupe_entities(entities):
+    """
+    Resolves duplicate and conflicting entities found in overlapping chunks.
+    Identical document spans keep the highest score. Of two overlapping spans of the
+    same type, the one that lies farther from the edge of its chunk wins (its optional
+    '_margin'), then the longer one, then the higher-scoring one. So a span cut off at
+    a chunk boundary loses to the full span, and partial overlaps keep a single hit.
+    """
+    best = {}
+    for entity in entities:
+        key = (entity['start'], entity['end'], entity['entity'])
+        if key not in best or entity['score'] > best[key]['score']:
+            best[key] = entity
+
+    def rank(entity):
+        return (entity.get('_margin', 0), entity['end'] - entity['start'], entity['score'])
+
+    unique_entities = []
+    last_kept = {}
+    for entity in sorted(best.values(), key=lambda e: (e['start'], -e['end'])):
+        previous = last_kept.get(entity['entity'])
+        if previous is not None and entity['start'] < previous['end']:
+            if rank(entity) <= rank(previous):
+                continue
+            unique_entities.remove(previous)
+        last_kept[entity['entity']] = entity
+        unique_entities.append(entity)
+    return sorted(unique_entities, key=lambda e: (e['start'], e['end']))
+
+
+def _final(entity):
+    entity.pop('_margin', None)
+    return entity
+
+
+def chunk_margin(entity, chunk_start: int, chunk_end: int, text_length: int):
+    """
+    Returns how far an entity lies from the edges of its chunk; the document's own
+    start and end are not chunk edges.
+    """
+    left = entity['start'] - chunk_start if chunk_start > 0 else float('inf')
+    right = chunk_end - entity['end'] if chunk_end < text_length else float('inf')
+    return min(left, right)
+
+class LegalAnalyzer:
+    # Which models each analysis task needs. Risk analysis is lexicon-based and needs none.
+    TASK_MODELS = {"risk": (), "clauses": ("ner",), "summary": ("summarization",)}
+    BACKENDS = ("pytorch", "int8", "onnx")
+
+    def __init__(self, ner_model_path="dslim/bert-base-NER", summarization_model_path="t5-base", ner_batch_size=8, summarization_batch_size=4, cache=None, risk_lexicon_path=None, micro_batching=False, max_batch_size=16, max_wait_ms=10.0, backend="pytorch", draft_model_path=None):
+        """
+        Initializes the LegalAnalyzer. The models are loaded lazily on first use;
+        call warm_up() to load them ahead of time.
+        If a ResultCache is given, clause extraction and summaries are cached by document content.
+        risk_lexicon_path points to a JSON weighted lexicon; the built-in lexicon is used otherwise.
+        With micro_batching=True, NER and summarization chunks from all concurrent callers
+        are collected into shared batches of up to max_batch_size, waiting at most max_wait_ms.
+        backend selects the inference runtime: "pytorch" (fp32), "int8" (dynamic quantization)
+        or "onnx" (ONNX Runtime, if installed).
+        draft_model_path names a smaller summarization model with the same vocabulary
+        (e.g. t5-small for t5-base) used for assisted generation, which decodes greedily
+        instead of with beam search; see _generate_group.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Choose one of: {', '.join(self.BACKENDS)}.")
+        # Determine device (use GPU if available)
+        self.device = 0 if torch.cuda.is_available() else -1
+        self.ner_model_path = ner_model_path
+        self.summarization_model_path = summarization_model_path
+        self.backend = backend
+        self.draft_model_path = draft_model_path
+        self.ner_batch_size = ner_batch_size
+        self.summarization_batch_size = summarization_batch_size
+        self.cache = cache
+        self.risk_engine = RiskEngine.from_file(risk_lexicon_path) if risk_lexicon_path else RiskEngine()
+        self.load_times = {}
+        self.micro_batching = micro_batching
+        self._ner_batcher = MicroBatcher(
+            self._run_ner_batch,
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name="ner",
+        )
+        self._summary_batcher = MicroBatcher(
+            self._generate_summaries, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name="summarization",
+        )
+        self._pipelines = {}
+        self._load_lock = threading.Lock()
+        # Running estimate of summarization cost, used to turn time budgets into token budgets
+        self.summary_seconds_per_token = None
+        # Intra-op threads per model; None leaves torch's setting alone
+        self.ner_threads = None
+        self.summarization_threads = None
+
+    def _get_pipeline(self, name: str):
+        """
+        Returns the named pipeline ("ner", "summarization" or "draft"), loading it on first use.
+        The draft model is loaded as a summarization pipeline.
+        """
+        loaded = self._pipelines.get(name)
+        if loaded is not None:
+            return loaded
+
+        with self._load_lock:
+            if name not in self._pipelines:
+                model_path = {
+                    "ner": self.ner_model_path,
+                    "summarization": self.summarization_model_path,
+                    "draft": self.draft_model_path,
+                }[name]
+                print(f"Loading {name} model '{model_path}'... This may take a moment.")
+                started = time.perf_counter()
+                self._pipelines[name] = self._build_pipeline("summarization" if name == "draft" else name, model_path)
+                self.load_times[name] = time.perf_counter() - started
+                MODEL_LOAD_SECONDS.set(self.load_times[name], model=name)
+                print(f"Loaded {name} model ({self.backend} backend) in {self.load_times[name]:.1f}s.")
+        return self._pipelines[name]
+
+    def _build_pipeline(self, name: str, model_path: str):
+        """
+        Builds a pipeline for the configured backend:
+        - "pytorch": the fp32 model as published.
+        - "int8": dynamic int8 quantization of every Linear layer (CPU only).
+        - "onnx": ONNX Runtime via optimum when it is installed, otherwise int8.
+        """
+        if self.backend == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTModelForTokenClassification
+                from transformers import AutoTokenizer
+            except ImportError:
+                print("optimum[onnxruntime] is not installed. Falling back to the int8 backend.")
+                self.backend = "int8"
+            else:
+                model_class = ORTModelForTokenClassification if name == "ner" else ORTModelForSeq2SeqLM
+                model = model_class.from_pretrained(model_path, export=True)
+                tokenizer = AutoTokenizer.from_pretrained(model_path)
+                return pipeline(name, model=model, tokenizer=tokenizer)
+
+        if self.backend == "int8" and self.device != -1:
+            print("int8 dynamic quantization only runs on CPU. Using the fp32 model on GPU.")
+            return pipeline(name, model=model_path, device=self.device)
+
+        loaded = pipeline(name, model=model_path, device=self.device)
+        if self.backend == "int8":
+            loaded.model = torch.quantization.quantize_dynamic(loaded.model, {torch.nn.Linear}, dtype=torch.qint8)
+        return loaded
+
+    @property
+    def ner_pipeline(self):
+        return self._get_pipeline("ner")
+
+    @ner_pipeline.setter
+    def ner_pipeline(self, value):
+        self._pipelines["ner"] = value
+
+    @property
+    def summarizer_pipeline(self):
+        return self._get_pipeline("summarization")
+
+    @summarizer_pipeline.setter
+    def summarizer_pipeline(self, value):
+        self._pipelines["summarization"] = value
+
+    def set_thread_split(self, ner_threads: int, summarization_threads: int):
+        """
+        Gives NER and summarization their own number of intra-op threads, so both can run
+        at the same time without oversubscribing the cores. With torch's default OpenMP
+        backend the thread count is per calling thread, so it is set by whichever thread
+        runs each model.
+        """
+        self.ner_threads = ner_threads
+        self.summarization_threads = summarization_threads
+
+    @staticmethod
+    def _use_threads(num_threads):
+        if num_threads and torch.get_num_threads() != num_threads:
+            torch.set_num_threads(num_threads)
+
+    @property
+    def draft_model(self):
+        """
+        The draft model for assisted summarization, or None if none is configured or the
+        backend cannot use one.
+        """
+        if not self.draft_model_path or self.backend == "onnx":
+            return None
+        draft = self._get_pipeline("draft").model
+        if draft.config.vocab_size != self.summarizer_pipeline.model.config.vocab_size:
+            raise ValueError(
+                f"Draft model '{self.draft_model_path}' does not share the vocabulary of '{self.summarization_model_path}'."
+            )
+        return draft
+
+    def model_names(self):
+        names = ["ner", "summarization"]
+        if self.draft_model_path:
+            names.append("draft")
+        return names
+
+    def loaded_models(self):
+        """
+        Returns which models are currently loaded.
+        """
+        return {name: name in self._pipelines for name in self.model_names()}
+
+    def warm_up(self, tasks=("clauses", "summary")):
+        """
+        Loads the models needed for the given tasks and runs one small input through
+        each, so the first real request does not pay for loading or first-call setup.
+        """
+        sample = "This Agreement is made between Acme Corp and Beta LLC in New York."
+        for task in tasks:
+            for name in self.TASK_MODELS[task]:
+                model = self._get_pipeline(name)
+                if name == "ner":
+                    model(sample)
+                else:
+                    model(sample, max_length=20, min_length=5, do_sample=False)
+                    if self.draft_model is not None:
+                        self._generate_summaries([sample])
+        print(f"Warm-up complete for tasks: {', '.join(tasks) or 'none'}.")
+
+    # Entities carry character offsets, so they are keyed on the exact text
+    @cached(model_attrs=("ner_model_path", "backend"), exact_text=True)
+    def extract_clauses(self, text: str, chunk_size: int = None, overlap: int = 50, batch_size: int = None):
+        """
+        Extracts named entities from a legal document by chunking it.
+
+        All chunks are sent through the NER model in batches, and every
+        entity is returned with character offsets into the full document.
+        """
+        print("Extracting clauses by chunking document...")
+        return [
+            entity
+            for _, chunk_entities in self.iter_clauses(text, chunk_size, overlap, batch_size)
+            for entity in chunk_entities
+        ]
+
+    def iter_clauses(self, text: str, chunk_size: int = None, overlap: int = 50, batch_size: int = None):
+        """
+        Runs batched NER over the document and yields (chunk_index, entities) per chunk
+        as soon as the entities of that chunk are final.
+
+        Chunks hold at most chunk_size model tokens (the model's limit by default) and
+        overlap by about `overlap` tokens. They are produced lazily, so long documents
+        are never split up front. Entities that reach into the overlap with the next
+        chunk are held back until that chunk has been processed, so the yielded entities
+        are already deduped.
+        """
+        tokenizer = self.ner_pipeline.tokenizer
+        max_tokens = chunk_size or self._max_input_tokens(tokenizer, limit=512)
+        special_tokens = tokenizer.num_special_tokens_to_add()
+
+        def iter_windows():
+            for start, end, num_tokens in iter_token_chunks(text, tokenizer, max_tokens, overlap):
+                # Model input tokens, special tokens included, like the summary chunks
+                CHUNK_TOKENS.observe(num_tokens + special_tokens, task="ner")
+                yield start, end
+
+        windows = iter_windows()
+
+        if self.micro_batching:
+            # The shared scheduler batches these chunks with those of other in-flight requests
+            chunk_outputs = self._iter_scheduled_ner(text, windows)
+        else:
+            batch_size = batch_size or self.ner_batch_size
+            print(f"Running NER in chunks of up to {max_tokens} tokens (batch size {batch_size})...")
+            self._use_threads(self.ner_threads)
+            chunk_outputs = self._iter_pipeline_ner(text, windows, batch_size)
+
+        pending = []
+        previous = None
+        num_chunks = 0
+        while True:
+            # Only the wait for the model output is timed, not the consumer
+            with span("ner_chunk", chunk=num_chunks):
+                output = next(chunk_outputs, None)
+            if output is None:
+                break
+            (chunk_start, chunk_end), chunk_entities = output
+
+            # The previous chunk's entities are final once this chunk's start is known
+            if previous is not None:
+                index, candidates = previous
+                yield index, [_final(entity) for entity in candidates if entity['end'] <= chunk_start]
+                pending = [entity for entity in candidates if entity['end'] > chunk_start]
+
+            # Shift chunk-relative offsets so they point into the full document
+            pieces = [
+                {
+                    "entity": entity['entity'],
+                    "score": float(entity['score']), # Convert numpy.float32 to python float
+                    "word": entity['word'],
+                    "start": chunk_start + int(entity['start']),
+                    "end": chunk_start + int(entity['end']),
+                }
+                for entity in chunk_entities
+            ]
+            merged = merge_entity_pieces(pieces, text)
+            for entity in merged:
+                entity['_margin'] = chunk_margin(entity, chunk_start, chunk_end, len(text))
+            previous = (num_chunks, dedupe_entities(pending + merged))
+            num_chunks += 1
+
+        if previous is not None:
+            index, candidates = previous
+            yield index, [_final(entity) for entity in candidates]
+        DOCUMENT_CHUNKS.observe(num_chunks, task="ner")
+
+    def _iter_pipeline_ner(self, text, windows, batch_size):
+        """
+        Yields ((start, end), entities) per chunk from the NER pipeline.
+        """
+        queued = collections.deque()
+
+        def chunk_texts():
+            for start, end in windows:
+                queued.append((start, end))
+                yield text[start:end]
+
+        # Passing a generator makes the pipeline batch internally but hand back results one chunk at a time
+        for entities in self.ner_pipeline(chunk_texts(), batch_size=batch_size):
+            yield queued.popleft(), entities
+
+    def _iter_scheduled_ner(self, text, windows):
+        """
+        Yields ((start, end), entities) per chunk from the NER micro-batcher, keeping up
+        to one full batch of chunks submitted ahead of the one being waited on.
+        """
+        in_flight = collections.deque()
+        for window in windows:
+            in_flight.append((window, self._ner_batcher.submit(text[window[0]:window[1]])))
+            if len(in_flight) >= self._ner_batcher.max_batch_size:
+                window, future = in_flight.popleft()
+                yield window, future.result()
+        while in_flight:
+            window, future = in_flight.popleft()
+            yield window, future.result()
+
+    def _run_ner_batch(self, chunks):
+        """
+        Runs one micro-batch of chunks through the NER model.
+        """
+        self._use_threads(self.ner_threads)
+        with span("ner_batch", size=len(chunks)):
+            return self.ner_pipeline(chunks, batch_size=len(chunks))
+
+    @staticmethod
+    def _max_input_tokens(tokenizer, limit: int = 1024, prefix: str = ""):
+        """
+        Returns how many text tokens fit in one model input, after special tokens and the prefix.
+        """
+        reserved = tokenizer.num_special_tokens_to_add()
+        if prefix:
+            reserved += len(tokenizer(prefix, add_special_tokens=False)["input_ids"])
+        return min(tokenizer.model_max_length, limit) - reserved
+
+    # The draft model switches generation from beam search to greedy decoding, so it is part of the key
+    @cached(model_attrs=("summarization_model_path", "draft_model_path", "backend"))
+    def summarize_document(self, text: str, max_chunk_length: int = 1024, batched: bool = True, batch_size: int = None, token_budget: int = None, time_budget: float = None, reduce: bool = False, max_chunk_tokens: int = None): # Removed fixed max_summary_length
+        """
+        Generates a summary of a long legal document by summarizing chunks smartly.
+
+        In batched mode the text is split into sentence-aligned chunks of at most
+        max_chunk_tokens tokens (the model's input limit by default), chunks of similar
+        token length are grouped into buckets and each bucket is summarized with a
+        single padded generate call. Set batched=False for the one-chunk-at-a-time path,
+        which slices the text into max_chunk_length characters.
+
+        With a token_budget (input tokens) or time_budget (seconds), only the most salient
+        chunks that fit the budget are summarized; see summarize_within_budget.
+        """
+        if token_budget is not None or time_budget is not None:
+            return self.summarize_within_budget(text, max_chunk_tokens, batch_size, token_budget, time_budget, reduce)
+
+        if batched:
+            print("Summarizing document by splitting into sentence-aligned chunks...")
+            chunks, token_lengths = self._summary_chunks_with_lengths(text, max_chunk_tokens)
+            print(f"Summarizing {len(chunks)} chunks in length-bucketed batches...")
+            summaries = [""] * len(chunks)
+            for i, summary in self.iter_chunk_summaries(chunks, batch_size, token_lengths):
+                summaries[i] = summary
+            return " ".join(summary for summary in summaries if summary).strip()
+
+        print(f"Summarizing document by splitting into chunks...")
+        
+        # Split text into chunks that T5 can handle
+        chunks = [text[i:i + max_chunk_length] for i in range(0, len(text), max_chunk_length)]
+        full_summary = ""
+        
+        print(f"Summarizing {len(chunks)} chunks...")
+        for i, chunk in enumerate(chunks):
+            dynamic_max_length, dynamic_min_length = self._dynamic_summary_lengths(chunk)
+
+            try:
+                # Use the new dynamic lengths in the pipeline call
+                with span("summary_chunk", chunk=i, chars=len(chunk)):
+                    summary = self.summarizer_pipeline(
+                        chunk, 
+                        max_length=dynamic_max_length, 
+                        min_length=dynamic_min_length, 
+                        do_sample=False
+                    )
+                full_summary += summary[0]['summary_text'] + " "
+            except Exception as e:
+                print(f"Could not summarize chunk {i+1}. Error: {e}")
+
+        return full_summary.strip()
+
+    def summarize_within_budget(self, text: str, max_chunk_tokens: int = None, batch_size: int = None, token_budget: int = None, time_budget: float = None, reduce: bool = False):
+        """
+        Summarizes only the most salient chunks of a document, so the cost is bounded by the
+        budget instead of the document length.
+
+        Chunks are ranked with TextRank over TF-IDF vectors and taken best-first while their
+        input tokens fit the budget. A time_budget is converted to tokens with the measured
+        cost of earlier summaries. When nothing has been measured yet, the best chunk is
+        summarized first on its own and the rest of the time budget is converted with its
+        cost. The selected summaries are joined in document order; with reduce=True they
+        are summarized once more.
+        """
+        started = time.perf_counter()
+        chunks, token_lengths = self._summary_chunks_with_lengths(text, max_chunk_tokens)
+        if not chunks:
+            return ""
+
+        with span("summary_selection", chunks=len(chunks)):
+            scores = textrank_scores(chunks)
+        budget = token_budget if token_budget is not None else float("inf")
+        summaries = {}
+        if time_budget is not None:
+            if not self.summary_seconds_per_token:
+                # select_within_budget always keeps the best chunk, so it is summarized up front to calibrate
+                best = max(range(len(chunks)), key=lambda i: scores[i])
+                for _, summary in self.iter_chunk_summaries([chunks[best]], batch_size, [token_lengths[best]]):
+                    summaries[best] = summary
+                summaries.setdefault(best, "")
+            remaining = max(time_budget - (time.perf_counter() - started), 0.0)
+            spent = sum(token_lengths[i] for i in summaries)
+            if self.summary_seconds_per_token:
+                budget = min(budget, spent + remaining / self.summary_seconds_per_token)
+            else:
+                # The calibration chunk failed before it was timed, so no more time is spent
+                budget = min(budget, spent)
+
+        selected = select_within_budget(scores, token_lengths, budget)
+        print(f"Summarizing the {len(selected)} most salient of {len(chunks)} chunks within the budget...")
+
+        pending = [i for i in selected if i not in summaries]
+        for i, summary in self.iter_chunk_summaries([chunks[i] for i in pending], batch_size, [token_lengths[i] for i in pending]):
+            summaries[pending[i]] = summary
+        summary = " ".join(summaries.get(i, "") for i in selected if summaries.get(i)).strip()
+
+        if reduce and len(selected) > 1 and summary:
+            # Reduce pass: summarize the concatenated chunk summaries
+            parts, part_lengths = self._summary_chunks_with_lengths(summary, max_chunk_tokens)
+            reduced = [""] * len(parts)
+            for i, part in self.iter_chunk_summaries(parts, batch_size, part_lengths):
+                reduced[i] = part
+            summary = " ".join(part for part in reduced if part).strip() or summary
+        return summary
+
+    def iter_summary_chunks(self, text: str, max_chunk_tokens: int = None):
+        """
+        Lazily splits text into sentence-aligned chunks that fit the summarization model.
+        Yields (chunk, num_tokens), where num_tokens includes the prefix and special tokens.
+        """
+        tokenizer = self.summarizer_pipeline.tokenizer
+        limit = self._max_input_tokens(tokenizer, limit=1024, prefix=self._summary_prefix())
+        reserved = min(tokenizer.model_max_length, 1024) - limit
+        for start, end, num_tokens in iter_token_chunks(text, tokenizer, min(max_chunk_tokens or limit, limit)):
+            yield text[start:end], num_tokens + reserved
+
+    def split_for_summary(self, text: str, max_chunk_tokens: int = None):
+        """
+        Splits text into sentence-aligned chunks of at most max_chunk_tokens model tokens.
+        """
+        return [chunk for chunk, _ in self.iter_summary_chunks(text, max_chunk_tokens)]
+
+    def _summary_chunks_with_lengths(self, text: str, max_chunk_tokens: int = None):
+        chunks, token_lengths = [], []
+        for chunk, num_tokens in self.iter_summary_chunks(text, max_chunk_tokens):
+            chunks.append(chunk)
+            token_lengths.append(num_tokens)
+        return chunks, token_lengths
+
+    @staticmethod
+    def _dynamic_summary_lengths(chunk: str):
+        """
+        Returns (max_length, min_length) for summarizing a chunk.
+        """
+        # --- FIX: Dynamic max_length ---
+        # For summarization, a good max_length is often about half the input length.
+        # We also set a reasonable floor and ceiling.
+        chunk_length = len(chunk.split()) # Get number of words in chunk
+
+        # Set max_length to be half the chunk length, but no more than 150 and no less than 20.
+        dynamic_max_length = min(max(int(chunk_length / 2), 20), 150)
+        # We also set a minimum length to be smaller.
+        dynamic_min_length = min(max(int(chunk_length / 4), 5), 30)
+        return dynamic_max_length, dynamic_min_length
+
+    def iter_chunk_summaries(self, chunks, batch_size: int = None, token_lengths=None):
+        """
+        Summarizes chunks in buckets of similar token length, one generate call per bucket
+        (split further when its chunks have different summary length limits).
+        Yields (chunk_index, summary) as each bucket finishes, so the order follows the
+        buckets rather than the document. Chunks that fail are skipped. Pass the
+        token_lengths from iter_summary_chunks to skip tokenizing the chunks again.
+
+        With micro-batching enabled the chunks go to the shared scheduler instead, which
+        batches them together with chunks from other in-flight requests.
+        """
+        if not chunks:
+            return
+
+        # Sort chunk indices by token length so each bucket needs as little padding as possible
+        if token_lengths is None:
+            tokenizer = self.summarizer_pipeline.tokenizer
+            prefix = self._summary_prefix()
+            token_lengths = [len(ids) for ids in tokenizer([prefix + chunk for chunk in chunks])["input_ids"]]
+        order = sorted(range(len(chunks)), key=lambda i: token_lengths[i])
+        DOCUMENT_CHUNKS.observe(len(chunks), task="summary")
+        for length in token_lengths:
+            CHUNK_TOKENS.observe(length, task="summary")
+
+        if self.micro_batching:
+            futures = {self._summary_batcher.submit(chunks[i]): i for i in order}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    yield i, future.result()
+                except Exception as e:
+                    print(f"Could not summarize chunk {i + 1}. Error: {e}")
+            return
+
+        batch_size = batch_size or self.summarization_batch_size
+        for b in range(0, len(order), batch_size):
+            bucket = order[b:b + batch_size]
+            try:
+                summaries = self._generate_summaries([chunks[i] for i in bucket])
+            except Exception as e:
+                print(f"Could not summarize chunks {[i + 1 for i in bucket]}. Error: {e}")
+                continue
+
+            for i, summary in zip(bucket, summaries):
+                yield i, summary
+
+    def _summary_prefix(self):
+        # The pipeline takes the task prefix (T5's "summarize: ") from task_specific_params
+        pipe = self.summarizer_pipeline
+        prefix = getattr(pipe, "prefix", None)
+        if prefix is None:
+            prefix = getattr(pipe.model.config, "prefix", None)
+        return prefix or ""
+
+    def _generation_config(self):
+        """
+        Returns the pipeline's generation config, which carries the task_specific_params
+        (beam search, length penalty, ...) the pipeline decodes with. Older transformers
+        keep these on the model config and have no generation config.
+        """
+        pipe = self.summarizer_pipeline
+        return getattr(pipe, "generation_config", None) or getattr(pipe.model, "generation_config", None)
+
+    def _generate_summaries(self, chunks):
+        """
+        Summarizes a list of chunks exactly as the summarization pipeline would, one at a
+        time: with its prefix and generation config and each chunk's own length limits.
+        Chunks with the same limits share one padded generate call.
+        """
+        groups = {}
+        for i, chunk in enumerate(chunks):
+            groups.setdefault(self._dynamic_summary_lengths(chunk), []).append(i)
+
+        summaries = [""] * len(chunks)
+        for (max_length, min_length), indices in groups.items():
+            group = self._generate_group([chunks[i] for i in indices], max_length, min_length)
+            for i, summary in zip(indices, group):
+                summaries[i] = summary
+        return summaries
+
+    def _generate_group(self, chunks, max_length: int, min_length: int):
+        """
+        Summarizes chunks that share length limits with a single padded generate call.
+
+        With a draft model, each chunk is generated with assisted (speculative) decoding
+        instead: the draft proposes several tokens at a time and the main model checks them
+        in one forward pass. Assisted generation only supports greedy decoding, so beam
+        search is turned off (num_beams=1) and the summaries differ from the default beam
+        search ones; they match the main model's own greedy output token for token.
+        """
+        tokenizer = self.summarizer_pipeline.tokenizer
+        model = self.summarizer_pipeline.model
+        prefix = self._summary_prefix()
+
+        inputs = tokenizer(
+            [prefix + chunk for chunk in chunks],
+            padding=True,
+            truncation=True,
+            max_length=min(tokenizer.model_max_length, 1024),
+            return_tensors="pt",
+        ).to(model.device)
+        input_tokens = int(inputs["attention_mask"].sum())
+        self._use_threads(self.summarization_threads)
+        started = time.perf_counter()
+        # The same arguments the pipeline call in summarize_document(batched=False) uses
+        generation = {"max_length": max_length, "min_length": min_length, "do_sample": False}
+        generation_config = self._generation_config()
+        if generation_config is not None:
+            generation["generation_config"] = generation_config
+        draft_model = self.draft_model
+        with torch.no_grad(), span("summary_batch", size=len(chunks), tokens=input_tokens, assisted=draft_model is not None):
+            if draft_model is None:
+                output_ids = model.generate(**inputs, **generation)
+            else:
+                # Assisted generation handles one sequence at a time, so padding is dropped per chunk
+                output_ids = []
+                for input_ids, attention_mask in zip(inputs["input_ids"], inputs["attention_mask"]):
+                    keep = attention_mask.bool()
+                    output_ids.extend(model.generate(
+                        input_ids=input_ids[keep].unsqueeze(0),
+                        attention_mask=attention_mask[keep].unsqueeze(0),
+                        assistant_model=draft_model,
+                        num_beams=1,
+                        **generation,
+                    ))
+        seconds_per_token = (time.perf_counter() - started) / max(input_tokens, 1)
+        previous = self.summary_seconds_per_token
+        self.summary_seconds_per_token = seconds_per_token if previous is None else 0.8 * previous + 0.2 * seconds_per_token
+        return [summary.strip() for summary in tokenizer.batch_decode(output_ids, skip_special_tokens=True)]
+
+    def batching_stats(self):
+        """
+        Returns batch-size and queue-wait statistics of the micro-batching schedulers.
+        """
+        if not self.micro_batching:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "ner": self._ner_batcher.stats(),
+            "summarization": self._summary_batcher.stats(),
+        }
+
+    def analyze_risk(self, text: str) -> str:
+        """
+        Performs a weighted lexicon-based risk analysis and returns the overall label.
+        """
+        return self.assess_risk(text)["label"]
+
+    def assess_risk(self, text: str):
+        """
+        Returns the overall risk label and score along with the risky clauses and their spans.
+        """
+        return self.risk_engine.assess(text)
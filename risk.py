@@ -0,0 +1,185 @@
+import bisect
+import json
+import re
+
+# term -> (weight, category). Variants of a term share a category, and each category
+# counts once towards the document score, so "terminate" and "termination" are not
+# double counted.
+DEFAULT_LEXICON = {
+    "terminate": (1.0, "termination"),
+    "terminated": (1.0, "termination"),
+    "termination": (1.0, "termination"),
+    "indemnify": (1.0, "indemnification"),
+    "indemnification": (1.0, "indemnification"),
+    "indemnity": (1.0, "indemnification"),
+    "hold harmless": (1.0, "indemnification"),
+    "liability": (1.0, "liability"),
+    "liabilities": (1.0, "liability"),
+    "liable": (1.0, "liability"),
+    "unlimited liability": (2.0, "liability"),
+    "breach": (1.0, "breach"),
+    "material breach": (1.5, "breach"),
+    "default": (1.0, "default"),
+    "event of default": (1.5, "default"),
+    "waive": (1.0, "waiver"),
+    "waiver": (1.0, "waiver"),
+    "penalty": (1.0, "penalty"),
+    "penalties": (1.0, "penalty"),
+    "liquidated damages": (1.5, "penalty"),
+    "sole discretion": (1.0, "discretion"),
+    "non-compete": (1.0, "restrictive covenant"),
+    "exclusivity": (0.5, "restrictive covenant"),
+    "automatic renewal": (0.5, "renewal"),
+    "auto-renew": (0.5, "renewal"),
+}
+
+
+def _trie_pattern(terms):
+    """
+    Builds a regex alternation from a character trie of the terms, so the pattern
+    branches on shared prefixes instead of trying every term at every position.
+    Spaces inside terms match any run of whitespace.
+
+    Where a term ends, the pattern has an empty named group. Returns the pattern and a
+    dict from group name to term, so a match maps back to its term via lastgroup even
+    when case-insensitive matching lets through text that does not lowercase to it.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = term
+
+    group_terms = {}
+
+    def build(node):
+        branches = []
+        for char in sorted(key for key in node if key):
+            atom = r"\s+" if char == " " else re.escape(char)
+            branches.append(atom + build(node[char]))
+        if "" in node:
+            name = f"t{len(group_terms)}"
+            group_terms[name] = node[""]
+            # Longer terms are tried first, as with a greedy optional suffix
+            branches.append(f"(?P<{name}>)")
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie), group_terms
+
+
+class RiskEngine:
+    """
+    Scores legal text against a weighted lexicon in a single pass.
+
+    All terms are compiled into one case-insensitive regex that only matches whole
+    words, so the cost of a scan barely grows with the size of the lexicon.
+    """
+    def __init__(self, lexicon=None, high_threshold: float = 3.0, medium_threshold: float = 0.0):
+        lexicon = DEFAULT_LEXICON if lexicon is None else lexicon
+        self.lexicon = {}
+        for term, entry in lexicon.items():
+            weight, category = entry if isinstance(entry, (tuple, list)) else (entry, None)
+            key = " ".join(term.lower().split())
+            self.lexicon[key] = (float(weight), category or key)
+
+        # With the default lexicon, more than three risk categories is High Risk, as with
+        # the original rule of more than three keyword hits
+        self.high_threshold = high_threshold
+        self.medium_threshold = medium_threshold
+        self._pattern = None
+        if self.lexicon:
+            pattern, self._group_terms = _trie_pattern(self.lexicon)
+            self._pattern = re.compile(r"(?<!\w)" + pattern + r"(?!\w)", re.IGNORECASE)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs):
+        """
+        Loads a lexicon from a JSON file. Each entry maps a term either to a weight
+        or to an object with "weight" and optional "category".
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        lexicon = {}
+        for term, entry in data.items():
+            if isinstance(entry, dict):
+                lexicon[term] = (entry.get("weight", 1.0), entry.get("category"))
+            else:
+                lexicon[term] = (entry, None)
+        return cls(lexicon, **kwargs)
+
+    def label(self, score: float) -> str:
+        if score > self.high_threshold:
+            return "High Risk"
+        elif score > self.medium_threshold:
+            return "Medium Risk"
+        else:
+            return "Low Risk"
+
+    def find_matches(self, text: str):
+        """
+        Returns every lexicon hit as a dict with the term, its weight, category and span.
+        """
+        if self._pattern is None:
+            return []
+        matches = []
+        for match in self._pattern.finditer(text):
+            term = self._group_terms[match.lastgroup]
+            weight, category = self.lexicon[term]
+            matches.append({
+                "term": term,
+                "category": category,
+                "weight": weight,
+                "start": match.start(),
+                "end": match.end(),
+            })
+        return matches
+
+    def assess(self, text: str):
+        """
+        Scores the document and each clause in it.
+
+        The document score adds the highest weight seen in each category. Clause
+        scores add the weight of every hit in the clause, and only clauses with at
+        least one hit are returned.
+        """
+        matches = self.find_matches(text)
+
+        category_weights = {}
+        for match in matches:
+            category = match["category"]
+            category_weights[category] = max(category_weights.get(category, 0.0), match["weight"])
+        score = sum(category_weights.values())
+
+        clause_spans = clause_boundaries(text)
+        clause_starts = [start for start, _ in clause_spans]
+        clauses = {}
+        for match in matches:
+            index = max(bisect.bisect_right(clause_starts, match["start"]) - 1, 0)
+            start, end = clause_spans[index]
+            clause = clauses.setdefault(index, {"start": start, "end": end, "score": 0.0, "terms": []})
+            clause["score"] += match["weight"]
+            clause["terms"].append(match["term"])
+
+        return {
+            "label": self.label(score),
+            "score": score,
+            "categories": sorted(category_weights),
+            "clauses": [clauses[index] for index in sorted(clauses)],
+        }
+
+
+def clause_boundaries(text: str):
+    """
+    Splits text into clause spans at sentence punctuation, semicolons and line breaks.
+    Returns a list of (start, end) character offsets with surrounding whitespace trimmed.
+    """
+    spans = []
+    start = 0
+    for match in re.finditer(r"(?<=[.!?;])\s+|\n\s*", text):
+        if text[start:match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text.rstrip())))
+    return spans or [(0, len(text))]
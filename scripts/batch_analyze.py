@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import torch
+
+from corpus import ProcessedCorpus
+from project import import_project_module
+
+LegalAnalyzer = import_project_module("models").LegalAnalyzer
+
+PROCESSED_DIR = "data/processed"
+OUTPUT_DIR = "data/analysis"
+ALL_TASKS = ["risk", "clauses", "summary"]
+FORMATS = ("jsonl", "parquet")
+
+# Nested fields are stored as JSON strings in Parquet so every part file has the same schema
+NESTED_FIELDS = ("risky_clauses", "extracted_clauses")
+
+
+def shard_doc_ids(doc_ids, shard: int, num_shards: int):
+    return [doc_id for doc_id in doc_ids if doc_id % num_shards == shard]
+
+
+class ShardWriter:
+    """
+    Appends the results of one shard to its output and records progress in a checkpoint.
+
+    The checkpoint is replaced atomically after every flushed batch and stores the
+    processed doc_ids together with the committed output position (the JSONL byte
+    offset, or the number of Parquet part files). On resume, output written after the
+    last checkpoint is discarded, so an interrupted batch is redone and never duplicated.
+    """
+    def __init__(self, output_dir: str, shard: int, output_format: str = "jsonl"):
+        self.output_format = output_format
+        self.name = f"shard-{shard:03d}"
+        self.checkpoint_path = os.path.join(output_dir, f"{self.name}.checkpoint.json")
+        if output_format == "jsonl":
+            self.path = os.path.join(output_dir, f"{self.name}.jsonl")
+        else:
+            self.path = os.path.join(output_dir, self.name)
+            os.makedirs(self.path, exist_ok=True)
+
+        checkpoint = {"done": [], "position": 0}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        self.done = set(checkpoint["done"])
+        self.position = checkpoint["position"]
+        self._discard_uncommitted()
+
+    def _discard_uncommitted(self):
+        if self.output_format == "jsonl":
+            with open(self.path, "a+b") as f:
+                f.truncate(self.position)
+            return
+        for filename in os.listdir(self.path):
+            if filename.endswith(".parquet") and int(filename.split("-")[1].split(".")[0]) >= self.position:
+                os.remove(os.path.join(self.path, filename))
+
+    def write_batch(self, records):
+        if not records:
+            return
+        if self.output_format == "jsonl":
+            with open(self.path, "ab") as f:
+                for record in records:
+                    f.write((json.dumps(record) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self.position = f.tell()
+        else:
+            rows = [
+                {key: json.dumps(value) if key in NESTED_FIELDS else value for key, value in record.items()}
+                for record in records
+            ]
+            pq.write_table(pa.Table.from_pylist(rows), os.path.join(self.path, f"part-{self.position:05d}.parquet"))
+            self.position += 1
+
+        self.done.update(record["doc_id"] for record in records)
+        with open(self.checkpoint_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "position": self.position}, f)
+        os.replace(self.checkpoint_path + ".tmp", self.checkpoint_path)
+
+
+def summarize_batch(analyzer, texts, batch_size=None):
+    """
+    Summarizes several documents at once: the chunks of all of them go through one
+    length-bucketed generate loop, so batches stay full even for short documents.
+    """
+    chunks, token_lengths, owners = [], [], []
+    for index, text in enumerate(texts):
+        for chunk, num_tokens in analyzer.iter_summary_chunks(text):
+            chunks.append(chunk)
+            token_lengths.append(num_tokens)
+            owners.append(index)
+
+    summaries = [[] for _ in texts]
+    chunk_summaries = [""] * len(chunks)
+    for i, summary in analyzer.iter_chunk_summaries(chunks, batch_size, token_lengths):
+        chunk_summaries[i] = summary
+    for owner, summary in zip(owners, chunk_summaries):
+        if summary:
+            summaries[owner].append(summary)
+    return [" ".join(parts).strip() for parts in summaries]
+
+
+def analyze_batch(analyzer, documents, tasks):
+    """
+    Runs the requested tasks on a batch of documents and returns one record per document.
+    """
+    texts = [document["cleaned_text"] or "" for document in documents]
+    records = [{"doc_id": document["doc_id"], "contract_path": document["contract_path"]} for document in documents]
+
+    if "risk" in tasks:
+        for record, text in zip(records, texts):
+            risk_report = analyzer.assess_risk(text)
+            record["risk_assessment"] = risk_report["label"]
+            record["risk_score"] = risk_report["score"]
+            record["risky_clauses"] = risk_report["clauses"]
+
+    if "clauses" in tasks:
+        for record, text in zip(records, texts):
+            record["extracted_clauses"] = analyzer.extract_clauses(text) if text.strip() else []
+
+    if "summary" in tasks:
+        for record, summary in zip(records, summarize_batch(analyzer, texts)):
+            record["summary"] = summary
+
+    return records
+
+
+def run_shard(shard, num_shards, args):
+    """
+    Analyzes every document of one shard that is not in its checkpoint yet.
+    Returns (documents analyzed, seconds spent).
+    """
+    torch.set_num_threads(args.threads_per_shard or max(1, (os.cpu_count() or 1) // num_shards))
+    corpus = ProcessedCorpus(args.processed_dir)
+    writer = ShardWriter(args.output_dir, shard, args.format)
+
+    doc_ids = sorted(shard_doc_ids(corpus.document_column("doc_id").to_pylist(), shard, num_shards))
+    remaining = [doc_id for doc_id in doc_ids if doc_id not in writer.done]
+    print(f"[Shard {shard}] {len(remaining)} of {len(doc_ids)} documents left to analyze.")
+    if not remaining:
+        return 0, 0.0
+
+    # The corpus is re-analyzed after a model update, so the result cache is bypassed
+    analyzer = LegalAnalyzer(
+        ner_model_path=args.ner_model,
+        summarization_model_path=args.summarization_model,
+        ner_batch_size=args.ner_batch_size,
+        summarization_batch_size=args.summarization_batch_size,
+        backend=args.backend,
+    )
+    analyzer.warm_up([task for task in args.tasks if task != "risk"])
+
+    started = time.perf_counter()
+    analyzed = 0
+    for i in range(0, len(remaining), args.batch_size):
+        documents = [
+            {"doc_id": doc_id, "contract_path": corpus.document(doc_id, "contract_path"), "cleaned_text": corpus.document(doc_id)}
+            for doc_id in remaining[i:i + args.batch_size]
+        ]
+        writer.write_batch(analyze_batch(analyzer, documents, args.tasks))
+        analyzed += len(documents)
+        elapsed = time.perf_counter() - started
+        print(f"[Shard {shard}] {analyzed}/{len(remaining)} documents, {analyzed / elapsed:.2f} docs/s")
+    return analyzed, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze the whole processed corpus offline.")
+    parser.add_argument("--processed-dir", default=PROCESSED_DIR)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--format", default="jsonl", choices=FORMATS)
+    parser.add_argument("--tasks", nargs="+", default=ALL_TASKS, choices=ALL_TASKS)
+    parser.add_argument("--shards", type=int, default=1, help="Number of worker processes.")
+    parser.add_argument("--shard", type=int, default=None, help="Run only this shard (e.g. one per machine).")
+    parser.add_argument("--threads-per-shard", type=int, default=None, help="Torch threads per shard (defaults to cores / shards).")
+    parser.add_argument("--batch-size", type=int, default=32, help="Documents per batch and checkpoint.")
+    parser.add_argument("--ner-batch-size", type=int, default=32)
+    parser.add_argument("--summarization-batch-size", type=int, default=16)
+    parser.add_argument("--ner-model", default="dslim/bert-base-NER")
+    parser.add_argument("--summarization-model", default="t5-base")
+    parser.add_argument("--backend", default="pytorch", choices=LegalAnalyzer.BACKENDS)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    shards = [args.shard] if args.shard is not None else list(range(args.shards))
+
+    started = time.perf_counter()
+    if len(shards) == 1:
+        results = [run_shard(shards[0], args.shards, args)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            results = list(executor.map(run_shard, shards, [args.shards] * len(shards), [args] * len(shards)))
+    wall = time.perf_counter() - started
+
+    analyzed = sum(count for count, _ in results)
+    print(f"\nAnalyzed {analyzed} documents in {wall:.1f}s ({analyzed / wall if wall else 0.0:.2f} docs/s).")
+    print(f"Results saved to: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from benchmark_backends import process_rss_mb
+from synthetic_contracts import generate_contract
+from tiny_models import ensure_tiny_models
+from project import import_project_module
+
+LegalAnalyzer = import_project_module("models").LegalAnalyzer
+
+STAGES = ["analyze_risk", "extract_clauses", "summarize_document", "endpoint"]
+
+
+class PeakMemorySampler:
+    """
+    Samples the process RSS in a background thread and records the peak above the
+    starting level. Covers torch allocations, which tracemalloc does not see.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._baseline = process_rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, process_rss_mb() - self._baseline)
+            time.sleep(self.interval)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def make_stage(analyzer, stage):
+    """
+    Returns a callable that runs one stage on a document.
+    """
+    if stage == "endpoint":
+        from fastapi.testclient import TestClient
+        main = import_project_module("main")
+
+        # Serve the benchmark analyzer instead of the configured one
+        main.analyzer = analyzer
+        client = TestClient(main.app)
+
+        def call_endpoint(text):
+            response = client.post("/analyze", json={"text": text})
+            response.raise_for_status()
+            return response.json()
+        return call_endpoint
+    return getattr(analyzer, stage)
+
+
+def run_case(run, documents, concurrency, repeats):
+    """
+    Runs the stage over the documents `repeats` times with `concurrency` threads and
+    returns latency, throughput and peak memory figures.
+    """
+    latencies = []
+
+    def timed(text):
+        started = time.perf_counter()
+        run(text)
+        latencies.append(time.perf_counter() - started)
+
+    work = [text for _ in range(repeats) for text in documents]
+    with PeakMemorySampler() as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, work))
+        wall = time.perf_counter() - started
+
+    words = sum(len(text.split()) for text in work)
+    return {
+        "median_ms": 1000 * percentile(latencies, 0.5),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "throughput_docs_per_s": len(work) / wall,
+        "throughput_words_per_s": words / wall,
+        "peak_rss_increase_mb": memory.peak_mb,
+    }
+
+
+def run_benchmarks(args):
+    if args.real_models:
+        ner_model, summarization_model = "dslim/bert-base-NER", "t5-base"
+    else:
+        ner_model, summarization_model = ensure_tiny_models(args.models_dir)
+
+    analyzer = LegalAnalyzer(
+        ner_model_path=ner_model,
+        summarization_model_path=summarization_model,
+        micro_batching=args.micro_batching,
+        backend=args.backend,
+    )
+    analyzer.warm_up()
+
+    results = []
+    for words in args.sizes:
+        documents = [
+            generate_contract(words, clause_density=args.density, seed=seed) for seed in range(args.documents)
+        ]
+        for stage in args.stages:
+            run = make_stage(analyzer, stage)
+            for concurrency in args.concurrency:
+                print(f"[Bench] {stage}: {words} words, concurrency {concurrency}...")
+                case = run_case(run, documents, concurrency, args.repeats)
+                case.update({"stage": stage, "words": words, "concurrency": concurrency})
+                results.append(case)
+                print(f"        median {case['median_ms']:.1f} ms, {case['throughput_docs_per_s']:.2f} docs/s")
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "ner_model": ner_model,
+            "summarization_model": summarization_model,
+            "backend": args.backend,
+            "micro_batching": args.micro_batching,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Flags every case whose median latency grew, or throughput fell, by more than `threshold`.
+    Returns the list of regressions.
+    """
+    def key(case):
+        return case["stage"], case["words"], case["concurrency"]
+
+    previous = {key(case): case for case in baseline["results"]}
+    regressions = []
+    for case in current["results"]:
+        old = previous.get(key(case))
+        if old is None:
+            continue
+        latency_change = case["median_ms"] / old["median_ms"] - 1 if old["median_ms"] else 0.0
+        throughput_change = 1 - case["throughput_docs_per_s"] / old["throughput_docs_per_s"] if old["throughput_docs_per_s"] else 0.0
+        status = "REGRESSION" if latency_change > threshold or throughput_change > threshold else "ok"
+        print(
+            f"{status:>10}  {case['stage']:<20} {case['words']:>7} words  x{case['concurrency']:<3} "
+            f"median {old['median_ms']:.1f} -> {case['median_ms']:.1f} ms ({latency_change:+.0%})"
+        )
+        if status == "REGRESSION":
+            regressions.append({"case": key(case), "latency_change": latency_change, "throughput_change": throughput_change})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis stages on synthetic contracts.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 8000], help="Document sizes in words.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--documents", type=int, default=2, help="Distinct documents per size.")
+    parser.add_argument("--density", type=float, default=0.2, help="Fraction of risky clauses.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--backend", default="pytorch", choices=LegalAnalyzer.BACKENDS)
+    parser.add_argument("--micro-batching", action="store_true")
+    parser.add_argument("--real-models", action="store_true", help="Use the production models (needs network or a warm HF cache).")
+    parser.add_argument("--models-dir", default="data/bench_models")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before a case is flagged.")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\n--- Comparison against {args.compare} (threshold {args.threshold:.0%}) ---")
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) found.")
+            sys.exit(1)
+        print("\nNo regressions found.")
+
+
+if __name__ == "__main__":
+    main()
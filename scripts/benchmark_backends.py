@@ -0,0 +1,156 @@
+import argparse
+import gc
+import io
+import json
+import os
+import time
+
+import torch
+
+from project import import_project_module
+
+LegalAnalyzer = import_project_module("models").LegalAnalyzer
+
+SAMPLE_CONTRACT = (
+    "This Master Services Agreement is entered into as of January 1, 2025 by and between "
+    "Acme Corporation, a Delaware corporation with offices in New York, and Beta Logistics LLC. "
+    "The Service Provider shall indemnify and hold harmless the Client against all liabilities "
+    "arising out of any material breach of this Agreement. Either party may terminate this "
+    "Agreement upon thirty days written notice to the other party. Payments not received within "
+    "forty-five days shall incur a penalty of two percent per month. Any waiver of a provision "
+    "must be in writing and signed by an officer of Acme Corporation. "
+) * 8
+
+
+def process_rss_mb():
+    """
+    Returns the resident set size of this process in MB (Linux only, 0 elsewhere).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return 0.0
+
+
+def model_size_mb(model):
+    """
+    Returns the serialized size of a torch model's weights in MB.
+    """
+    if not isinstance(model, torch.nn.Module):
+        return None
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / 1e6
+
+
+def entity_f1(reference, candidate):
+    """
+    F1 of exact (start, end, entity type) matches between two entity lists.
+    """
+    ref = {(e["start"], e["end"], e["entity"]) for e in reference}
+    cand = {(e["start"], e["end"], e["entity"]) for e in candidate}
+    if not ref and not cand:
+        return 1.0
+    true_positives = len(ref & cand)
+    precision = true_positives / len(cand) if cand else 0.0
+    recall = true_positives / len(ref) if ref else 0.0
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+
+def unigram_overlap(reference, candidate):
+    """
+    ROUGE-1 style F1 of word overlap between two summaries.
+    """
+    ref_counts, cand_counts = {}, {}
+    for word in reference.lower().split():
+        ref_counts[word] = ref_counts.get(word, 0) + 1
+    for word in candidate.lower().split():
+        cand_counts[word] = cand_counts.get(word, 0) + 1
+    overlap = sum(min(count, cand_counts.get(word, 0)) for word, count in ref_counts.items())
+    if not overlap:
+        return 1.0 if not ref_counts and not cand_counts else 0.0
+    precision = overlap / sum(cand_counts.values())
+    recall = overlap / sum(ref_counts.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def measure_backend(backend, texts, repeats):
+    """
+    Loads both models with the given backend and times clause extraction and summarization.
+    """
+    gc.collect()
+    rss_before = process_rss_mb()
+    analyzer = LegalAnalyzer(backend=backend)
+    analyzer.warm_up()
+
+    result = {
+        "backend": analyzer.backend,
+        "load_seconds": dict(analyzer.load_times),
+        "rss_increase_mb": process_rss_mb() - rss_before,
+        "ner_model_mb": model_size_mb(analyzer.ner_pipeline.model),
+        "summarization_model_mb": model_size_mb(analyzer.summarizer_pipeline.model),
+    }
+
+    timings = {"extract_clauses": [], "summarize_document": []}
+    for _ in range(repeats):
+        # Keep the outputs of the last repeat for the agreement check
+        outputs = {"entities": [], "summaries": []}
+        for text in texts:
+            started = time.perf_counter()
+            outputs["entities"].append(analyzer.extract_clauses(text))
+            timings["extract_clauses"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            outputs["summaries"].append(analyzer.summarize_document(text))
+            timings["summarize_document"].append(time.perf_counter() - started)
+
+    for stage, values in timings.items():
+        values.sort()
+        result[f"{stage}_median_seconds"] = values[len(values) // 2]
+    del analyzer
+    return result, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare quantized CPU backends against the fp32 baseline.")
+    parser.add_argument("--backends", nargs="+", default=["int8", "onnx"], choices=LegalAnalyzer.BACKENDS)
+    parser.add_argument("--input", help="A .txt contract to benchmark (defaults to a built-in sample).")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Optional path to write the results as JSON.")
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            texts = [f.read()]
+    else:
+        texts = [SAMPLE_CONTRACT]
+
+    print("Measuring fp32 baseline...")
+    baseline, baseline_outputs = measure_backend("pytorch", texts, args.repeats)
+    results = [baseline]
+
+    for backend in args.backends:
+        print(f"\nMeasuring {backend} backend...")
+        result, outputs = measure_backend(backend, texts, args.repeats)
+        result["entity_f1_vs_fp32"] = sum(
+            entity_f1(ref, cand) for ref, cand in zip(baseline_outputs["entities"], outputs["entities"])
+        ) / len(texts)
+        result["summary_overlap_vs_fp32"] = sum(
+            unigram_overlap(ref, cand) for ref, cand in zip(baseline_outputs["summaries"], outputs["summaries"])
+        ) / len(texts)
+        for stage in ("extract_clauses", "summarize_document"):
+            result[f"{stage}_speedup"] = baseline[f"{stage}_median_seconds"] / result[f"{stage}_median_seconds"]
+        results.append(result)
+
+    print("\n--- Backend Comparison ---")
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import json
+import sys
+import time
+
+from benchmark_backends import SAMPLE_CONTRACT
+from project import import_project_module
+from synthetic_contracts import generate_contract
+
+LegalAnalyzer = import_project_module("models").LegalAnalyzer
+
+
+def measure_generation(analyzer, chunks, repeats):
+    """
+    Summarizes the chunks `repeats` times, one generate call per batch as in production,
+    and returns the timings together with the summaries of the last repeat.
+    """
+    tokenizer = analyzer.summarizer_pipeline.tokenizer
+    batch_size = analyzer.summarization_batch_size
+    timings = []
+    for _ in range(repeats):
+        summaries = []
+        started = time.perf_counter()
+        for b in range(0, len(chunks), batch_size):
+            summaries.extend(analyzer._generate_summaries(chunks[b:b + batch_size]))
+        timings.append(time.perf_counter() - started)
+
+    generated_tokens = sum(len(ids) for ids in tokenizer(summaries, add_special_tokens=False)["input_ids"])
+    timings.sort()
+    median = timings[len(timings) // 2]
+    return {
+        "median_seconds": median,
+        "generated_tokens": generated_tokens,
+        "tokens_per_second": generated_tokens / median if median else 0.0,
+    }, summaries
+
+
+def use_greedy_decoding(analyzer):
+    """
+    Assisted decoding is greedy, so the baseline is switched from beam search to greedy
+    decoding too and the two runs can be compared token for token.
+    """
+    config = analyzer._generation_config() or analyzer.summarizer_pipeline.model.config
+    config.num_beams = 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare assisted (draft model) summarization against plain greedy decoding.")
+    parser.add_argument("--summarization-model", default="t5-base")
+    parser.add_argument("--draft-model", default="t5-small")
+    parser.add_argument("--backend", default="pytorch", choices=LegalAnalyzer.BACKENDS)
+    parser.add_argument("--input", help="A .txt contract to summarize (defaults to a built-in sample).")
+    parser.add_argument("--words", type=int, default=0, help="Use a synthetic contract of this many words instead.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Optional path to write the results as JSON.")
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            text = f.read()
+    elif args.words:
+        text = generate_contract(args.words)
+    else:
+        text = SAMPLE_CONTRACT
+
+    baseline_analyzer = LegalAnalyzer(summarization_model_path=args.summarization_model, backend=args.backend)
+    baseline_analyzer.warm_up(["summary"])
+    use_greedy_decoding(baseline_analyzer)
+    chunks = baseline_analyzer.split_for_summary(text)
+    print(f"Summarizing {len(chunks)} chunks with {args.summarization_model}...")
+    baseline, baseline_summaries = measure_generation(baseline_analyzer, chunks, args.repeats)
+
+    assisted_analyzer = LegalAnalyzer(
+        summarization_model_path=args.summarization_model, backend=args.backend, draft_model_path=args.draft_model,
+    )
+    # Share the main model so both runs use the exact same weights
+    assisted_analyzer.summarizer_pipeline = baseline_analyzer.summarizer_pipeline
+    assisted_analyzer.warm_up(["summary"])
+    print(f"Summarizing {len(chunks)} chunks with {args.draft_model} as the draft model...")
+    assisted, assisted_summaries = measure_generation(assisted_analyzer, chunks, args.repeats)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(baseline_summaries, assisted_summaries)) if a != b]
+    results = {
+        "summarization_model": args.summarization_model,
+        "draft_model": args.draft_model,
+        "backend": args.backend,
+        "chunks": len(chunks),
+        "baseline": baseline,
+        "assisted": assisted,
+        "speedup": baseline["median_seconds"] / assisted["median_seconds"] if assisted["median_seconds"] else 0.0,
+        "identical_outputs": not mismatches,
+        "mismatched_chunks": mismatches,
+    }
+
+    print("\n--- Assisted Decoding Comparison ---")
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.output}")
+    if mismatches:
+        print(f"\n{len(mismatches)} chunk summaries differ from the baseline.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
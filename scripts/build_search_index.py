@@ -0,0 +1,59 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+import pyarrow.parquet as pq
+
+from batch_analyze import NESTED_FIELDS, OUTPUT_DIR, PROCESSED_DIR
+from corpus import ProcessedCorpus
+from project import import_project_module
+
+search = import_project_module("search")
+CHUNK_WORDS, VECTOR_DIM, SearchIndexBuilder = search.CHUNK_WORDS, search.VECTOR_DIM, search.SearchIndexBuilder
+
+INDEX_DIR = "data/search_index"
+
+
+def iter_analysis_records(analysis_dir=OUTPUT_DIR):
+    """
+    Yields the records written by batch_analyze.py, from JSONL shards or Parquet parts.
+    """
+    for path in sorted(glob.glob(os.path.join(analysis_dir, "shard-*.jsonl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    for path in sorted(glob.glob(os.path.join(analysis_dir, "shard-*", "part-*.parquet"))):
+        for row in pq.read_table(path).to_pylist():
+            for field in NESTED_FIELDS:
+                if row.get(field) is not None:
+                    row[field] = json.loads(row[field])
+            yield row
+
+
+def build_search_index(analysis_dir=OUTPUT_DIR, processed_dir=PROCESSED_DIR, index_dir=INDEX_DIR, dim=VECTOR_DIM, chunk_words=CHUNK_WORDS):
+    """
+    Indexes every analyzed document together with its text from the processed corpus.
+    """
+    corpus = ProcessedCorpus(processed_dir)
+    builder = SearchIndexBuilder(dim=dim, chunk_words=chunk_words)
+    started = time.perf_counter()
+    for record in iter_analysis_records(analysis_dir):
+        builder.add(record["doc_id"], corpus.document(record["doc_id"]) or "", record, record.get("contract_path"))
+    builder.write(index_dir)
+    print(f"Search index built in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the clause search index from batch analysis results.")
+    parser.add_argument("--analysis-dir", default=OUTPUT_DIR, help="Output directory of batch_analyze.py.")
+    parser.add_argument("--processed-dir", default=PROCESSED_DIR)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--dim", type=int, default=VECTOR_DIM, help="Dimensions of the hashed chunk vectors.")
+    parser.add_argument("--chunk-words", type=int, default=CHUNK_WORDS)
+    args = parser.parse_args()
+
+    build_search_index(args.analysis_dir, args.processed_dir, args.index_dir, args.dim, args.chunk_words)
@@ -0,0 +1,118 @@
+import os
+
+import pyarrow as pa
+
+DOCUMENTS_FILE = "documents.arrow"
+CONTRACTS_FILE = "contracts.arrow"
+
+DOCUMENT_SCHEMA = pa.schema([
+    ("doc_id", pa.int64()),
+    ("contract_path", pa.string()),
+    ("sha256", pa.string()),
+    ("contract_text", pa.large_string()),
+    ("cleaned_text", pa.large_string()),
+])
+
+
+class CorpusWriter:
+    """
+    Writes the processed corpus as Arrow IPC files.
+
+    Every unique document is stored once in documents.arrow, written in record batches
+    of `batch_size` documents so only one batch of text is in memory at a time. The
+    per-row CUAD metadata goes to contracts.arrow and points at documents by doc_id.
+    """
+    def __init__(self, output_dir: str, batch_size: int = 64):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self._buffer = {name: [] for name in DOCUMENT_SCHEMA.names}
+        self._path = os.path.join(output_dir, DOCUMENTS_FILE)
+        self._sink = pa.OSFile(self._path + ".tmp", "wb")
+        self._writer = pa.ipc.new_file(self._sink, DOCUMENT_SCHEMA)
+        self.documents_written = 0
+
+    def add_document(self, doc_id: int, contract_path: str, sha256: str, contract_text: str, cleaned_text: str):
+        for name, value in zip(DOCUMENT_SCHEMA.names, (doc_id, contract_path, sha256, contract_text, cleaned_text)):
+            self._buffer[name].append(value)
+        if len(self._buffer["doc_id"]) >= self.batch_size:
+            self._flush()
+
+    def write_contracts(self, table: pa.Table):
+        """
+        Writes the per-row metadata table, which must have a doc_id column.
+        """
+        path = os.path.join(self.output_dir, CONTRACTS_FILE)
+        with pa.OSFile(path + ".tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=4096)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        self._sink.close()
+        # Only replace the previous corpus once the new one is complete
+        os.replace(self._path + ".tmp", self._path)
+
+    def _flush(self):
+        if not self._buffer["doc_id"]:
+            return
+        batch = pa.RecordBatch.from_pydict(self._buffer, schema=DOCUMENT_SCHEMA)
+        self._writer.write_batch(batch)
+        self.documents_written += batch.num_rows
+        self._buffer = {name: [] for name in DOCUMENT_SCHEMA.names}
+
+
+class ProcessedCorpus:
+    """
+    Memory-mapped reader for the corpus written by CorpusWriter.
+
+    Opening it reads only the file footers; text is paged in by the OS when a batch
+    or column is actually accessed, so load time and memory do not grow with the
+    size of the corpus text.
+    """
+    def __init__(self, processed_dir: str = "data/processed"):
+        self._documents = pa.ipc.open_file(pa.memory_map(os.path.join(processed_dir, DOCUMENTS_FILE), "r"))
+        self._contracts = pa.ipc.open_file(pa.memory_map(os.path.join(processed_dir, CONTRACTS_FILE), "r"))
+        # doc_id -> (batch index, row) is built from the small doc_id column only
+        self._locations = {}
+        for batch_index in range(self._documents.num_record_batches):
+            doc_ids = self._documents.get_batch(batch_index).column("doc_id").to_pylist()
+            for row, doc_id in enumerate(doc_ids):
+                self._locations[doc_id] = (batch_index, row)
+
+    @property
+    def num_documents(self) -> int:
+        return len(self._locations)
+
+    def iter_documents(self, columns=("doc_id", "cleaned_text")):
+        """
+        Yields one dict per document with the requested columns, one record batch at a time.
+        """
+        for batch_index in range(self._documents.num_record_batches):
+            batch = self._documents.get_batch(batch_index).select(list(columns))
+            yield from batch.to_pylist()
+
+    def document(self, doc_id: int, column: str = "cleaned_text"):
+        """
+        Returns one column of a single document without touching the others.
+        """
+        batch_index, row = self._locations[doc_id]
+        return self._documents.get_batch(batch_index).column(column)[row].as_py()
+
+    def document_column(self, column: str) -> pa.ChunkedArray:
+        """
+        Projects a single column of the documents table (zero-copy from the memory map).
+        """
+        return pa.chunked_array(
+            [self._documents.get_batch(i).column(column) for i in range(self._documents.num_record_batches)],
+            type=DOCUMENT_SCHEMA.field(column).type,
+        )
+
+    def contracts(self, columns=None) -> pa.Table:
+        """
+        Returns the per-row CUAD metadata, optionally projected to some columns.
+        """
+        table = self._contracts.read_all()
+        return table.select(list(columns)) if columns else table
@@ -1,7 +1,21 @@
 import pandas as pd
+import pyarrow as pa
+import argparse
+import hashlib
+import json
 import os
-import pdfplumber
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from tqdm import tqdm
+from corpus import CorpusWriter, ProcessedCorpus
+from project import import_project_module
+
+# Shared with the API's upload endpoint
+extract_text_from_pdf = import_project_module("extraction").extract_text_from_pdf
+
+PROCESSED_DIR = "data/processed"
+MANIFEST_PATH = os.path.join(PROCESSED_DIR, "extraction_manifest.json")
+TEXT_CACHE_DIR = os.path.join(PROCESSED_DIR, "extracted_text")
 
 def find_data_path(root_dir="data/raw/cuad/CUAD_v1"):
     """
@@ -23,25 +37,125 @@ def find_data_path(root_dir="data/raw/cuad/CUAD_v1"):
     # If neither path is valid
     return None
 
-def extract_text_from_pdf(pdf_path):
+def extract_contract_text(path):
+    """
+    Returns the text of a contract file. Plain-text files are read directly;
+    PDFs go through pdfplumber.
+    """
+    if path is None:
+        return ""
+    if path.lower().endswith(".txt"):
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return f.read()
+        except OSError as e:
+            print(f"Error reading {path}: {e}")
+            return ""
+    return extract_text_from_pdf(path)
+
+
+def index_contract_files(data_path):
+    """
+    Maps each contract's file name stem to its path. The plain-text copies in
+    'full_contract_txt' are preferred over the PDFs, which need slow parsing.
+    """
+    index = {}
+    for folder, extensions in (("full_contract_pdf", (".pdf",)), ("full_contract_txt", (".txt",))):
+        for root, _, files in os.walk(os.path.join(data_path, folder)):
+            for name in files:
+                stem, extension = os.path.splitext(name)
+                if extension.lower() in extensions:
+                    index[stem] = os.path.join(root, name)
+    return index
+
+
+def stable_doc_id(contract_path):
+    """
+    Derives a document's id from its file name stem (the key contracts are indexed by),
+    so ids do not shift when contracts are added or removed. Batch analysis checkpoints
+    and the search index refer to documents by id.
+    """
+    stem = os.path.splitext(os.path.basename(contract_path))[0]
+    digest = hashlib.sha256(stem.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & 0x7FFFFFFFFFFFFFFF
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _extract_to_cache(path, force=False):
+    """
+    Worker task: extracts one contract and stores its text under its content hash.
+    Returns (path, manifest entry).
+    """
+    stat = os.stat(path)
+    content_hash = file_sha256(path)
+    text_file = os.path.join(TEXT_CACHE_DIR, content_hash + ".txt")
+    if force or not os.path.exists(text_file):
+        text = extract_contract_text(path)
+        with open(text_file + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(text_file + ".tmp", text_file)
+    return path, {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": content_hash, "text_file": text_file}
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, manifest_path=MANIFEST_PATH):
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def extract_texts_incremental(paths, workers=None, manifest_path=MANIFEST_PATH, force=False):
     """
-    Extracts text from a single PDF file, handling potential errors.
+    Extracts the text of every unique contract file in parallel and returns the manifest
+    entries {path: entry}; each entry's "text_file" holds the extracted text.
+
+    A manifest keyed by path records each file's mtime, size and content hash, and the
+    extracted text is cached on disk by content hash, so re-runs only parse files that
+    are new or have changed. force=True re-extracts everything.
     """
-    text = ""
-    if not os.path.exists(pdf_path):
-        # print(f"Warning: PDF file not found at {pdf_path}")
-        return text
+    os.makedirs(TEXT_CACHE_DIR, exist_ok=True)
+    manifest = {} if force else load_manifest(manifest_path)
+    unique_paths = sorted({path for path in paths if path and os.path.exists(path)})
+
+    stale = []
+    for path in unique_paths:
+        entry = manifest.get(path)
+        stat = os.stat(path)
+        if (
+            entry is None
+            or not os.path.exists(entry["text_file"])
+            or (entry["mtime"], entry["size"]) != (stat.st_mtime, stat.st_size)
+        ):
+            stale.append(path)
+
+    print(f"{len(unique_paths) - len(stale)} of {len(unique_paths)} contracts unchanged since the last run.")
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(partial(_extract_to_cache, force=force), stale, chunksize=8)
+            for path, entry in tqdm(results, total=len(stale), desc="Extracting contracts"):
+                manifest[path] = entry
+        save_manifest(manifest, manifest_path)
+
+    return {path: manifest[path] for path in unique_paths}
+
+
+def read_extracted_text(entry):
+    with open(entry["text_file"], "r", encoding="utf-8") as f:
+        return f.read()
 
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        return text
-    except Exception as e:
-        print(f"Error processing PDF {pdf_path}: {e}")
-        return "" # Return empty string if PDF is corrupt or unreadable
 
 def preprocess_text(text):
     """
@@ -53,10 +167,16 @@ def preprocess_text(text):
     return text.strip()
 
 
-def load_and_process_cuad():
+def load_and_process_cuad(workers=None, force=False, write_csv=False):
     """
-    Loads the CUAD master CSV, finds contract texts from PDFs,
-    and returns a processed DataFrame.
+    Loads the CUAD master CSV, finds contract texts from the full_contract_txt files
+    (or the PDFs when no text copy exists), and writes the processed corpus.
+    Extraction runs on a process pool and only touches new or changed files.
+
+    The corpus is written as Arrow IPC files (see scripts/corpus.py): each document's
+    text is stored once, batch by batch, and the returned DataFrame holds only the
+    per-row metadata with a doc_id column. write_csv=True also writes the legacy
+    processed_contracts.csv.
     """
     data_path = find_data_path()
     if data_path is None:
@@ -68,38 +188,65 @@ def load_and_process_cuad():
     csv_path = os.path.join(data_path, "master_clauses.csv")
     df = pd.read_csv(csv_path)
 
-    # The PDF files are in a subfolder named "full_contract_txt"
-    contracts_dir = os.path.join(data_path, "full_contract_txt")
+    print("\nExtracting text from all contracts... (Only new or changed files are parsed)")
+    contract_files = index_contract_files(data_path)
+    df['contract_path'] = df['Filename'].map(lambda f: contract_files.get(os.path.splitext(os.path.basename(f))[0]))
+    missing = df['contract_path'].isna().sum()
+    if missing:
+        print(f"Warning: no contract file found for {missing} rows.")
 
-    print("\nExtracting text from all contract PDFs... (This may take a while)")
-    
-    # Use tqdm to show a progress bar
-    tqdm.pandas(desc="Processing contracts")
-    
-    # Create the full path to the PDF and then extract text
-    df['pdf_path'] = df['Filename'].apply(lambda f: os.path.join(contracts_dir, f))
-    df['contract_text'] = df['pdf_path'].progress_apply(extract_text_from_pdf)
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    entries = extract_texts_incremental(df['contract_path'].tolist(), workers=workers, force=force)
+    doc_ids = {path: stable_doc_id(path) for path in entries}
+    if len(set(doc_ids.values())) != len(doc_ids):
+        raise RuntimeError("Two contracts were assigned the same doc_id.")
+    df['doc_id'] = df['contract_path'].map(lambda path: doc_ids.get(path, -1)).astype("int64")
 
     print("\nCleaning and normalizing contract text...")
-    df['cleaned_text'] = df['contract_text'].progress_apply(preprocess_text)
-    
-    # Save the processed data for faster loading next time
-    processed_dir = "data/processed"
-    os.makedirs(processed_dir, exist_ok=True)
-    output_path = os.path.join(processed_dir, "processed_contracts.csv")
-    df.to_csv(output_path, index=False)
-    
-    print(f"\nPreprocessing complete. Processed data saved to: {output_path}")
+    # Each unique document is read and cleaned once, and only one batch is held in memory
+    writer = CorpusWriter(PROCESSED_DIR)
+    for path, entry in tqdm(entries.items(), total=len(entries), desc="Writing documents"):
+        text = read_extracted_text(entry)
+        writer.add_document(doc_ids[path], path, entry["sha256"], text, preprocess_text(text))
+    writer.close()
+
+    # CUAD metadata columns mix types, so they are stored as strings
+    metadata = df.astype({column: "string" for column in df.columns if df[column].dtype == object})
+    writer.write_contracts(pa.Table.from_pandas(metadata, preserve_index=False))
+    print(f"\nPreprocessing complete. {writer.documents_written} documents saved to: {PROCESSED_DIR}")
+
+    if write_csv:
+        write_legacy_csv(df, os.path.join(PROCESSED_DIR, "processed_contracts.csv"))
     return df
 
 
+def write_legacy_csv(df, output_path, rows_per_chunk=100):
+    """
+    Writes the old one-file CSV layout (text repeated on every row), a chunk of rows at a time.
+    """
+    corpus = ProcessedCorpus(PROCESSED_DIR)
+    for start in range(0, len(df), rows_per_chunk):
+        chunk = df.iloc[start:start + rows_per_chunk].copy()
+        chunk['contract_text'] = chunk['doc_id'].map(lambda d: corpus.document(d, "contract_text") if d >= 0 else "")
+        chunk['cleaned_text'] = chunk['doc_id'].map(lambda d: corpus.document(d, "cleaned_text") if d >= 0 else "")
+        chunk.to_csv(output_path, index=False, mode="w" if start == 0 else "a", header=start == 0)
+    print(f"Legacy CSV saved to: {output_path}")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract and clean the CUAD contracts.")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (defaults to the CPU count).")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-extract every contract.")
+    parser.add_argument("--csv", action="store_true", help="Also write the legacy processed_contracts.csv.")
+    args = parser.parse_args()
+
     print("Starting preprocessing...")
-    cuad_df = load_and_process_cuad()
+    cuad_df = load_and_process_cuad(workers=args.workers, force=args.full, write_csv=args.csv)
     if cuad_df is not None:
         print("\n--- Preprocessing Summary ---")
-        print(f"Successfully processed {len(cuad_df)} documents.")
-        # Print info on a sample contract
+        print(f"Successfully processed {len(cuad_df)} rows.")
+        # Print info on a sample contract, read back through the memory-mapped corpus
+        corpus = ProcessedCorpus(PROCESSED_DIR)
+        first = cuad_df.iloc[0]
         print("\nExample of processed data (first contract):")
-        pd.set_option('display.max_colwidth', 100) # Show more text
-        print(cuad_df[['Filename', 'cleaned_text']].head(1))
+        print(f"{first['Filename']}: {corpus.document(int(first['doc_id']))[:100]}")
@@ -0,0 +1,23 @@
+import importlib
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+# The project root is itself the Python package (the tests import it as `src`), so the
+# scripts import it under the name of the checkout directory, whatever that is.
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PACKAGE = os.path.basename(PROJECT_ROOT)
+
+
+def import_project_module(name: str):
+    """
+    Imports a module of the project package, e.g. import_project_module("models").
+    The package is registered from PROJECT_ROOT directly, so nothing else in its parent
+    directory becomes importable.
+    """
+    if PACKAGE not in sys.modules:
+        spec = importlib.machinery.ModuleSpec(PACKAGE, None, is_package=True)
+        spec.submodule_search_locations = [PROJECT_ROOT]
+        sys.modules[PACKAGE] = importlib.util.module_from_spec(spec)
+    return importlib.import_module(f"{PACKAGE}.{name}")
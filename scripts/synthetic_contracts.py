@@ -0,0 +1,79 @@
+import argparse
+import random
+
+PARTIES = [
+    "Acme Corporation", "Beta Logistics LLC", "Gamma Holdings Inc", "Delta Software Ltd",
+    "Epsilon Partners LP", "Zeta Manufacturing Co", "Northwind Traders", "Contoso Pharmaceuticals",
+]
+PLACES = ["New York", "Delaware", "California", "London", "Texas", "Ontario"]
+MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+
+# Sentences that carry risk-lexicon terms
+RISKY_CLAUSES = [
+    "{a} shall indemnify and hold harmless {b} against all liabilities arising from any material breach.",
+    "Either party may terminate this Agreement upon {n} days written notice if the other party is in default.",
+    "Late payments shall incur a penalty of {n} percent per month as liquidated damages.",
+    "{a} may modify the fees at its sole discretion without prior notice to {b}.",
+    "No waiver of any provision shall be effective unless signed by an officer of {a}.",
+    "{b} accepts unlimited liability for the acts of its subcontractors in {place}.",
+    "This Agreement shall be subject to automatic renewal for successive terms of {n} months.",
+]
+
+# Neutral boilerplate
+PLAIN_CLAUSES = [
+    "This Agreement is entered into on {month} {day}, {year} by and between {a} and {b}.",
+    "{a} shall deliver the Services described in Exhibit {n} in a professional manner.",
+    "All notices under this Agreement shall be sent to the addresses of {a} and {b} in {place}.",
+    "This Agreement shall be governed by the laws of the State of {place}.",
+    "The parties shall meet quarterly to review the performance of the Services.",
+    "Invoices shall be issued by {a} on the first business day of each month.",
+    "Headings are for convenience only and shall not affect the interpretation of this Agreement.",
+    "{b} shall maintain accurate records of all transactions for a period of {n} years.",
+]
+
+
+def generate_contract(num_words=2000, clause_density=0.2, seed=0, paragraph_every=6):
+    """
+    Generates a synthetic contract of roughly `num_words` words.
+
+    `clause_density` is the fraction of sentences drawn from the risky clause templates,
+    which also mention parties, dates and places for the NER model to find.
+    """
+    rng = random.Random(seed)
+    sentences = []
+    words = 0
+    while words < num_words:
+        templates = RISKY_CLAUSES if rng.random() < clause_density else PLAIN_CLAUSES
+        a, b = rng.sample(PARTIES, 2)
+        sentence = rng.choice(templates).format(
+            a=a, b=b,
+            n=rng.randint(2, 90),
+            place=rng.choice(PLACES),
+            month=rng.choice(MONTHS),
+            day=rng.randint(1, 28),
+            year=rng.randint(2015, 2026),
+        )
+        sentences.append(sentence)
+        words += len(sentence.split())
+
+    paragraphs = [
+        f"{i // paragraph_every + 1}. " + " ".join(sentences[i:i + paragraph_every])
+        for i in range(0, len(sentences), paragraph_every)
+    ]
+    return "\n\n".join(paragraphs)
+
+
+def generate_corpus(num_documents=10, num_words=2000, clause_density=0.2, seed=0):
+    return [generate_contract(num_words, clause_density, seed=seed + i) for i in range(num_documents)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic contract for testing and benchmarks.")
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--density", type=float, default=0.2, help="Fraction of risky clauses.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate_contract(args.words, args.density, args.seed))
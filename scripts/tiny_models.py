@@ -0,0 +1,100 @@
+import os
+import re
+
+from tokenizers import Tokenizer, models, pre_tokenizers, trainers
+from transformers import (
+    BertConfig,
+    BertForTokenClassification,
+    BertTokenizerFast,
+    PreTrainedTokenizerFast,
+    T5Config,
+    T5ForConditionalGeneration,
+)
+
+from synthetic_contracts import generate_corpus
+
+# Same label set as dslim/bert-base-NER, so the tiny model exercises the same merging code
+NER_LABELS = ["O", "B-MISC", "I-MISC", "B-PER", "I-PER", "B-ORG", "I-ORG", "B-LOC", "I-LOC"]
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def build_tiny_ner_model(output_dir, seed=0):
+    """
+    Saves a randomly initialized two-layer BERT token classifier and a WordPiece
+    vocabulary built from the synthetic corpus. No download is needed.
+    """
+    text = "\n".join(generate_corpus(num_documents=20, seed=seed))
+    words = sorted(set(re.findall(r"\w+|[^\w\s]", text)))
+    chars = sorted(set("".join(words)))
+    vocab = SPECIAL_TOKENS + chars + [f"##{c}" for c in chars] + [w for w in words if len(w) > 1]
+
+    os.makedirs(output_dir, exist_ok=True)
+    vocab_file = os.path.join(output_dir, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab) + "\n")
+    tokenizer = BertTokenizerFast(vocab_file=vocab_file, do_lower_case=False, model_max_length=2048)
+
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=128,
+        max_position_embeddings=2048,
+        num_labels=len(NER_LABELS),
+        id2label=dict(enumerate(NER_LABELS)),
+        label2id={label: i for i, label in enumerate(NER_LABELS)},
+    )
+    model = BertForTokenClassification(config)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def build_tiny_summarization_model(output_dir, seed=0):
+    """
+    Saves a randomly initialized two-layer T5 and a small BPE tokenizer trained on the
+    synthetic corpus. No download is needed.
+    """
+    text = generate_corpus(num_documents=20, seed=seed)
+    backend = Tokenizer(models.BPE(unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    backend.train_from_iterator(text, trainers.BpeTrainer(vocab_size=1000, special_tokens=["<pad>", "</s>", "<unk>"]))
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend, pad_token="<pad>", eos_token="</s>", unk_token="<unk>", model_max_length=1024,
+        # T5 takes no token_type_ids
+        model_input_names=["input_ids", "attention_mask"],
+    )
+
+    config = T5Config(
+        vocab_size=len(tokenizer),
+        d_model=64,
+        d_ff=128,
+        d_kv=16,
+        num_layers=2,
+        num_decoder_layers=2,
+        num_heads=2,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        decoder_start_token_id=tokenizer.pad_token_id,
+    )
+    model = T5ForConditionalGeneration(config)
+    os.makedirs(output_dir, exist_ok=True)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def ensure_tiny_models(models_dir="data/bench_models"):
+    """
+    Builds the tiny models once and returns (ner_model_path, summarization_model_path).
+    """
+    ner_dir = os.path.join(models_dir, "tiny-ner")
+    summarization_dir = os.path.join(models_dir, "tiny-t5")
+    if not os.path.exists(os.path.join(ner_dir, "config.json")):
+        print(f"Building tiny NER model in {ner_dir}...")
+        build_tiny_ner_model(ner_dir)
+    if not os.path.exists(os.path.join(summarization_dir, "config.json")):
+        print(f"Building tiny summarization model in {summarization_dir}...")
+        build_tiny_summarization_model(summarization_dir)
+    return ner_dir, summarization_dir
@@ -1,61 +1,277 @@
+import argparse
+import ast
+import hashlib
+import os
+import time
+
 import torch
 from transformers import (
     AutoTokenizer,
     AutoModelForTokenClassification,
+    DataCollatorForTokenClassification,
+    TrainerCallback,
     TrainingArguments,
     Trainer,
 )
-from datasets import Dataset
+from transformers.trainer_utils import get_last_checkpoint
+from datasets import Dataset, load_from_disk
+
+from corpus import DOCUMENTS_FILE, ProcessedCorpus
+
+BASE_MODEL = "nlpaueb/legal-bert-base-uncased"
+PROCESSED_DIR = "data/processed"
+TOKENIZED_CACHE_DIR = "data/processed/tokenized"
+
+# Columns of master_clauses.csv that are not clause categories
+METADATA_COLUMNS = {"Filename", "contract_path", "doc_id"}
 
-# This is a simplified example. A real implementation would need
-# to convert the CUAD dataset into a format suitable for NER.
-# The format should be a list of tokens and corresponding NER tags.
 
-def train_ner_model():
+def clause_categories(columns):
     """
-    Fine-tunes a Legal-BERT model for Named Entity Recognition.
+    CUAD stores each clause category as a column of extracted text plus a '<category>-Answer' column.
     """
-    # 1. Load tokenizer and model
-    tokenizer = AutoTokenizer.from_pretrained("nlpaueb/legal-bert-base-uncased")
-    model = AutoModelForTokenClassification.from_pretrained(
-        "nlpaueb/legal-bert-base-uncased", num_labels=41  # Number of clause types in CUAD
+    return [c for c in columns if f"{c}-Answer" in columns and c not in METADATA_COLUMNS]
+
+
+def build_label_list(categories):
+    labels = ["O"]
+    for category in categories:
+        labels += [f"B-{category}", f"I-{category}"]
+    return labels
+
+
+def parse_clause_texts(value):
+    """
+    Parses a CUAD clause cell, which holds a Python-style list of extracted strings.
+    """
+    if value is None or value in ("", "[]", "nan", "<NA>"):
+        return []
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        parsed = [value]
+    return [text for text in parsed if isinstance(text, str) and text.strip()]
+
+
+def iter_span_examples(processed_dir=PROCESSED_DIR):
+    """
+    Yields one example per contract: its cleaned text and the character spans of every
+    annotated clause, located in the text by exact (whitespace-normalized) match.
+    """
+    corpus = ProcessedCorpus(processed_dir)
+    contracts = corpus.contracts().to_pylist()
+    categories = clause_categories(list(contracts[0].keys())) if contracts else []
+
+    for row in contracts:
+        doc_id = row["doc_id"]
+        if doc_id is None or doc_id < 0:
+            continue
+        text = corpus.document(doc_id)
+        spans = []
+        for category in categories:
+            for clause in parse_clause_texts(row[category]):
+                clause = " ".join(clause.split())
+                start = text.find(clause)
+                if start >= 0:
+                    spans.append({"start": start, "end": start + len(clause), "label": category})
+        yield {"doc_id": doc_id, "text": text, "spans": spans}
+
+
+def tokenize_and_align_labels(batch, tokenizer, label2id, max_length, stride):
+    """
+    Batched Dataset.map function: tokenizes documents into overlapping windows and
+    assigns a BIO label to every token from the character spans. Special tokens get -100.
+    """
+    encoded = tokenizer(
+        batch["text"],
+        truncation=True,
+        max_length=max_length,
+        stride=stride,
+        return_overflowing_tokens=True,
+        return_offsets_mapping=True,
+    )
+
+    all_labels = []
+    for window, offsets in enumerate(encoded["offset_mapping"]):
+        spans = batch["spans"][encoded["overflow_to_sample_mapping"][window]]
+        labels = []
+        previous_span = None
+        for token_start, token_end in offsets:
+            if token_start == token_end:
+                labels.append(-100)
+                continue
+            span = next((s for s in spans if s["start"] <= token_start < s["end"]), None)
+            if span is None:
+                labels.append(label2id["O"])
+            else:
+                prefix = "I" if span is previous_span else "B"
+                labels.append(label2id[f"{prefix}-{span['label']}"])
+            previous_span = span
+        all_labels.append(labels)
+
+    encoded["labels"] = all_labels
+    # Used by the length-grouped sampler
+    encoded["length"] = [len(ids) for ids in encoded["input_ids"]]
+    encoded.pop("offset_mapping")
+    encoded.pop("overflow_to_sample_mapping")
+    return encoded
+
+
+def corpus_fingerprint(processed_dir, *parts):
+    """
+    Identifies a tokenized cache by the corpus file and the tokenization settings.
+    """
+    stat = os.stat(os.path.join(processed_dir, DOCUMENTS_FILE))
+    key = "|".join(str(p) for p in (stat.st_size, stat.st_mtime) + parts)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def load_tokenized_datasets(tokenizer, label2id, max_length=512, stride=128, num_proc=None, processed_dir=PROCESSED_DIR):
+    """
+    Tokenizes the corpus once with batched, multi-process Dataset.map calls and caches
+    the result on disk; later runs with the same corpus and settings load the cache.
+    """
+    fingerprint = corpus_fingerprint(processed_dir, tokenizer.name_or_path, max_length, stride, len(label2id))
+    cache_dir = os.path.join(TOKENIZED_CACHE_DIR, fingerprint)
+    if os.path.exists(cache_dir):
+        print(f"Loading tokenized dataset from cache: {cache_dir}")
+        return load_from_disk(cache_dir)
+
+    print("Building span examples from the processed corpus...")
+    examples = Dataset.from_generator(iter_span_examples, gen_kwargs={"processed_dir": processed_dir})
+    # Split by document so windows of one contract never land in both splits
+    splits = examples.train_test_split(test_size=0.1, seed=42)
+
+    print("Tokenizing and aligning labels...")
+    tokenized = splits.map(
+        tokenize_and_align_labels,
+        batched=True,
+        batch_size=16,
+        num_proc=num_proc or os.cpu_count(),
+        remove_columns=examples.column_names,
+        fn_kwargs={"tokenizer": tokenizer, "label2id": label2id, "max_length": max_length, "stride": stride},
     )
+    tokenized.save_to_disk(cache_dir)
+    print(f"Tokenized dataset saved to: {cache_dir}")
+    return tokenized
+
+
+class TokensPerSecondCallback(TrainerCallback):
+    """
+    Logs training throughput in (non-padding) tokens per second.
+    """
+    def __init__(self, mean_tokens_per_example, examples_per_step):
+        self.tokens_per_step = mean_tokens_per_example * examples_per_step
+        self.started = None
+        self.start_step = 0
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.started = time.perf_counter()
+        self.start_step = state.global_step
 
-    # 2. Prepare your data (this is a placeholder)
-    # You need to create a dataset of tokenized sentences and corresponding labels
-    train_texts = ["This is a sample sentence.", "Another example."]
-    train_tags = [[0, 0, 1, 0, 0], [0, 2, 0]] # Example tags
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        elapsed = time.perf_counter() - self.started
+        if logs is not None and elapsed > 0:
+            tokens = (state.global_step - self.start_step) * self.tokens_per_step
+            logs["tokens_per_second"] = round(tokens / elapsed, 1)
+            print(f"[Train] step {state.global_step}: {logs['tokens_per_second']} tokens/s")
 
-    train_dataset = Dataset.from_dict({
-        "tokens": [text.split() for text in train_texts],
-        "ner_tags": train_tags
-    })
+
+def train_ner_model(
+    output_dir="./results",
+    per_device_batch_size=16,
+    gradient_accumulation_steps=2,
+    num_train_epochs=3,
+    max_length=512,
+    stride=128,
+    num_proc=None,
+):
+    """
+    Fine-tunes a Legal-BERT model for Named Entity Recognition on the CUAD clauses.
+    """
+    # 1. Load tokenizer
+    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
+
+    # 2. Prepare the data: pre-tokenized, label-aligned and cached on disk
+    categories = clause_categories(ProcessedCorpus(PROCESSED_DIR).contracts().column_names)
+    labels = build_label_list(categories)
+    label2id = {label: i for i, label in enumerate(labels)}
+    datasets = load_tokenized_datasets(tokenizer, label2id, max_length, stride, num_proc)
+
+    model = AutoModelForTokenClassification.from_pretrained(
+        BASE_MODEL,
+        num_labels=len(labels),
+        id2label=dict(enumerate(labels)),
+        label2id=label2id,
+    )
 
     # 3. Define training arguments
     training_args = TrainingArguments(
-        output_dir="./results",
+        output_dir=output_dir,
         evaluation_strategy="epoch",
+        save_strategy="steps",
+        save_steps=500,
+        save_total_limit=2,
+        logging_steps=50,
         learning_rate=2e-5,
-        per_device_train_batch_size=16,
-        per_device_eval_batch_size=16,
-        num_train_epochs=3,
+        per_device_train_batch_size=per_device_batch_size,
+        per_device_eval_batch_size=per_device_batch_size,
+        gradient_accumulation_steps=gradient_accumulation_steps,
+        num_train_epochs=num_train_epochs,
         weight_decay=0.01,
+        # Batch windows of similar length together so dynamic padding wastes little
+        group_by_length=True,
+        length_column_name="length",
+        dataloader_num_workers=2,
+    )
+
+    lengths = datasets["train"]["length"]
+    throughput = TokensPerSecondCallback(
+        mean_tokens_per_example=sum(lengths) / max(len(lengths), 1),
+        examples_per_step=per_device_batch_size * gradient_accumulation_steps * max(training_args.world_size, 1),
     )
 
     # 4. Create a Trainer instance
     trainer = Trainer(
         model=model,
         args=training_args,
-        train_dataset=train_dataset,
-        # eval_dataset=eval_dataset, # You would also have an evaluation dataset
+        train_dataset=datasets["train"],
+        eval_dataset=datasets["test"],
+        # Pads each batch only to its own longest window
+        data_collator=DataCollatorForTokenClassification(tokenizer),
+        tokenizer=tokenizer,
+        callbacks=[throughput],
     )
 
-    # 5. Train the model
-    # trainer.train()
+    # 5. Train the model, resuming from the last checkpoint if a previous run was interrupted
+    last_checkpoint = get_last_checkpoint(output_dir) if os.path.isdir(output_dir) else None
+    if last_checkpoint:
+        print(f"Resuming training from checkpoint: {last_checkpoint}")
+    torch.manual_seed(42)
+    trainer.train(resume_from_checkpoint=last_checkpoint)
+
+    print("NER model training complete.")
+    model.save_pretrained("./models/legal_ner_model")
+    tokenizer.save_pretrained("./models/legal_ner_model")
 
-    print("NER model training complete (simulation).")
-    # In a real scenario, you would save the model:
-    # model.save_pretrained("./models/legal_ner_model")
 
 if __name__ == "__main__":
-    train_ner_model()
+    parser = argparse.ArgumentParser(description="Fine-tune Legal-BERT for clause NER on CUAD.")
+    parser.add_argument("--output-dir", default="./results")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--grad-accum", type=int, default=2)
+    parser.add_argument("--epochs", type=float, default=3)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--stride", type=int, default=128)
+    parser.add_argument("--num-proc", type=int, default=None, help="Processes for tokenization (defaults to the CPU count).")
+    args = parser.parse_args()
+
+    train_ner_model(
+        output_dir=args.output_dir,
+        per_device_batch_size=args.batch_size,
+        gradient_accumulation_steps=args.grad_accum,
+        num_train_epochs=args.epochs,
+        max_length=args.max_length,
+        stride=args.stride,
+        num_proc=args.num_proc,
+    )
@@ -0,0 +1,257 @@
+import json
+import mmap
+import os
+import re
+import zlib
+
+import numpy as np
+
+from .extractive import TOKEN_PATTERN
+
+VECTOR_DIM = 512
+CHUNK_WORDS = 200
+RISK_LEVELS = ("Low Risk", "Medium Risk", "High Risk")
+# Added to the cosine similarity for every query term that is an entity or risk term of the chunk
+KEYWORD_BOOST = 0.1
+
+
+def chunk_spans(text: str, chunk_words: int = CHUNK_WORDS):
+    """
+    Splits the text into consecutive windows of `chunk_words` words.
+    Returns (start_char, end_char) spans into the text.
+    """
+    words = [match.span() for match in re.finditer(r"\S+", text)]
+    return [
+        (words[i][0], words[min(i + chunk_words, len(words)) - 1][1])
+        for i in range(0, len(words), chunk_words)
+    ]
+
+
+def hashed_term_counts(text: str, dim: int = VECTOR_DIM):
+    """
+    Returns (bucket indices, sublinear term frequencies) of the text, with terms hashed
+    into `dim` buckets. crc32 is used because it is stable across processes.
+    """
+    counts = {}
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        bucket = zlib.crc32(token.encode("utf-8")) % dim
+        counts[bucket] = counts.get(bucket, 0) + 1
+    indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    return indices, 1.0 + np.log(values)
+
+
+def _keys_for_terms(prefix: str, text: str):
+    return {f"{prefix}:{token}" for token in TOKEN_PATTERN.findall(text.lower())}
+
+
+class SearchIndexBuilder:
+    """
+    Collects analyzed documents and writes a SearchIndex.
+
+    Every document is cut into chunks. Each chunk gets a hashed TF-IDF vector and is
+    added to the postings of the entity types, entity words and risk terms found in it.
+    """
+    def __init__(self, dim: int = VECTOR_DIM, chunk_words: int = CHUNK_WORDS):
+        self.dim = dim
+        self.chunk_words = chunk_words
+        self.documents = []
+        self._chunk_doc = []
+        self._chunk_spans = []
+        self._chunk_texts = []
+        self._chunk_terms = []
+        self._postings = {}
+
+    def add(self, doc_id: int, text: str, analysis: dict, contract_path: str = None):
+        """
+        Adds one document with its analysis result (as returned by /analyze).
+        """
+        doc_index = len(self.documents)
+        self.documents.append({
+            "doc_id": doc_id,
+            "contract_path": contract_path,
+            "risk_assessment": analysis.get("risk_assessment"),
+            "risk_score": analysis.get("risk_score"),
+        })
+
+        spans = chunk_spans(text, self.chunk_words)
+        if not spans:
+            return
+        starts = [start for start, _ in spans]
+        first_chunk = len(self._chunk_doc)
+        for start, end in spans:
+            self._chunk_doc.append(doc_index)
+            self._chunk_spans.append((start, end))
+            self._chunk_texts.append(text[start:end])
+            self._chunk_terms.append(hashed_term_counts(text[start:end], self.dim))
+
+        def chunk_of(offset):
+            return first_chunk + max(np.searchsorted(starts, offset, side="right") - 1, 0)
+
+        for entity in analysis.get("extracted_clauses") or []:
+            chunk = chunk_of(entity["start"])
+            keys = _keys_for_terms("term", entity["word"]) | {f"entity:{entity['entity']}"}
+            for key in keys:
+                self._postings.setdefault(key, set()).add(chunk)
+        for clause in analysis.get("risky_clauses") or []:
+            chunk = chunk_of(clause["start"])
+            for term in clause.get("terms", []):
+                for key in _keys_for_terms("term", term):
+                    self._postings.setdefault(key, set()).add(chunk)
+
+    def write(self, index_dir: str):
+        """
+        Writes the index files. Vectors, postings and chunk metadata are NumPy arrays
+        that SearchIndex memory-maps; chunk texts go to one file read by offset.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        num_chunks = len(self._chunk_doc)
+
+        document_frequency = np.zeros(self.dim, dtype=np.float32)
+        for indices, _ in self._chunk_terms:
+            document_frequency[indices] += 1
+        idf = np.log((1.0 + num_chunks) / (1.0 + document_frequency)) + 1.0
+
+        # Rows are written straight to the memory-mapped file, so the matrix is never held in memory
+        vectors = np.lib.format.open_memmap(
+            os.path.join(index_dir, "vectors.npy"), mode="w+", dtype=np.float32, shape=(max(num_chunks, 1), self.dim)
+        )
+        for row, (indices, values) in enumerate(self._chunk_terms):
+            weights = values * idf[indices]
+            norm = np.linalg.norm(weights)
+            vectors[row, indices] = weights / norm if norm > 0 else weights
+        vectors.flush()
+        del vectors
+        np.save(os.path.join(index_dir, "idf.npy"), idf)
+
+        np.save(os.path.join(index_dir, "chunk_doc.npy"), np.asarray(self._chunk_doc, dtype=np.int32))
+        np.save(os.path.join(index_dir, "chunk_spans.npy"), np.asarray(self._chunk_spans, dtype=np.int64).reshape(-1, 2))
+        risk_codes = [
+            RISK_LEVELS.index(doc["risk_assessment"]) if doc["risk_assessment"] in RISK_LEVELS else -1
+            for doc in self.documents
+        ]
+        np.save(os.path.join(index_dir, "doc_risk.npy"), np.asarray(risk_codes, dtype=np.int8))
+
+        text_offsets = [0]
+        with open(os.path.join(index_dir, "chunks.txt"), "wb") as f:
+            for chunk_text in self._chunk_texts:
+                encoded = chunk_text.encode("utf-8")
+                f.write(encoded)
+                text_offsets.append(text_offsets[-1] + len(encoded))
+        np.save(os.path.join(index_dir, "chunk_text_offsets.npy"), np.asarray(text_offsets, dtype=np.int64))
+
+        terms = {}
+        postings = []
+        offset = 0
+        for key in sorted(self._postings):
+            chunk_ids = sorted(self._postings[key])
+            terms[key] = [offset, len(chunk_ids)]
+            postings.extend(chunk_ids)
+            offset += len(chunk_ids)
+        np.save(os.path.join(index_dir, "postings.npy"), np.asarray(postings, dtype=np.int32))
+
+        with open(os.path.join(index_dir, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f)
+        with open(os.path.join(index_dir, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump(self.documents, f)
+        with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "chunk_words": self.chunk_words, "chunks": num_chunks, "documents": len(self.documents)}, f)
+        print(f"Indexed {num_chunks} chunks of {len(self.documents)} documents in {index_dir}.")
+
+
+class SearchIndex:
+    """
+    Memory-mapped clause search index written by SearchIndexBuilder.
+
+    Queries combine the cosine similarity of hashed TF-IDF chunk vectors with a boost
+    for chunks whose entities or risk terms match query terms. Risk level and entity
+    type filters narrow the candidate chunks before scoring. Vectors are paged in by
+    the OS as they are scored, so the index is never loaded into memory as a whole.
+    """
+    def __init__(self, index_dir: str):
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, "documents.json"), "r", encoding="utf-8") as f:
+            self.documents = json.load(f)
+        with open(os.path.join(index_dir, "terms.json"), "r", encoding="utf-8") as f:
+            self.terms = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode="r")
+
+        self.vectors = load("vectors.npy")
+        self.idf = np.load(os.path.join(index_dir, "idf.npy"))
+        self.chunk_doc = load("chunk_doc.npy")
+        self.chunk_spans = load("chunk_spans.npy")
+        self.doc_risk = load("doc_risk.npy")
+        self.postings_array = load("postings.npy")
+        self.chunk_text_offsets = load("chunk_text_offsets.npy")
+        with open(os.path.join(index_dir, "chunks.txt"), "rb") as f:
+            self._texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(f.name) else b""
+
+    @property
+    def num_chunks(self) -> int:
+        return self.meta["chunks"]
+
+    def postings(self, key: str) -> np.ndarray:
+        offset, length = self.terms.get(key, (0, 0))
+        return self.postings_array[offset:offset + length]
+
+    def query_vector(self, query: str) -> np.ndarray:
+        vector = np.zeros(self.meta["dim"], dtype=np.float32)
+        indices, values = hashed_term_counts(query, self.meta["dim"])
+        vector[indices] = values * self.idf[indices]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def chunk_text(self, chunk: int) -> str:
+        start, end = self.chunk_text_offsets[chunk], self.chunk_text_offsets[chunk + 1]
+        return self._texts[start:end].decode("utf-8")
+
+    def search(self, query: str, k: int = 10, risk_levels=None, entity_types=None):
+        """
+        Returns the k best matching chunks as dicts, best first. risk_levels keeps chunks of
+        documents with those risk assessments; entity_types keeps chunks containing at
+        least one entity of those types.
+        """
+        candidates = None
+        if risk_levels:
+            codes = [RISK_LEVELS.index(level) for level in risk_levels if level in RISK_LEVELS]
+            candidates = np.flatnonzero(np.isin(self.doc_risk[self.chunk_doc], codes))
+        if entity_types:
+            with_entities = np.unique(np.concatenate([self.postings(f"entity:{t}") for t in entity_types]))
+            candidates = with_entities if candidates is None else np.intersect1d(candidates, with_entities)
+        if self.num_chunks == 0 or (candidates is not None and len(candidates) == 0):
+            return []
+
+        boost = np.zeros(self.num_chunks, dtype=np.float32)
+        for key in _keys_for_terms("term", query):
+            boost[self.postings(key)] += KEYWORD_BOOST
+
+        query_vector = self.query_vector(query)
+        if candidates is None:
+            scores = self.vectors @ query_vector + boost
+            chunk_ids = np.arange(self.num_chunks)
+        else:
+            scores = self.vectors[candidates] @ query_vector + boost[candidates]
+            chunk_ids = candidates
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for position in top:
+            chunk = int(chunk_ids[position])
+            document = self.documents[int(self.chunk_doc[chunk])]
+            start, end = self.chunk_spans[chunk]
+            results.append({
+                "doc_id": document["doc_id"],
+                "contract_path": document["contract_path"],
+                "risk_assessment": document["risk_assessment"],
+                "score": float(scores[position]),
+                "start": int(start),
+                "end": int(end),
+                "text": self.chunk_text(chunk),
+            })
+        return results
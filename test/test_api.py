@@ -1,6 +1,9 @@
+import json
+import time
 import pytest
 from fastapi.testclient import TestClient
 from src.main import app  # Import the FastAPI app instance from your main.py
+from src.jobs import QueueFullError
 
 # A TestClient is a tool that lets you send requests to your FastAPI app in a test
 client = TestClient(app)
@@ -23,7 +26,7 @@ def mock_legal_analyzer(mocker):
     # Define the fake data our mock methods will return
     mock_clauses = [{"entity_group": "CLAUSE", "word": "indemnify", "score": 0.99}]
     mock_summary = "This is a contract summary."
-    mock_risk = "Medium Risk"
+    mock_risk = {"label": "Medium Risk", "score": 2.0, "categories": ["indemnification", "termination"], "clauses": []}
 
     # Use mocker to find the methods in 'src.main.analyzer' and replace them
     mocker.patch(
@@ -33,7 +36,7 @@ def mock_legal_analyzer(mocker):
         "src.main.analyzer.summarize_document", return_value=mock_summary
     )
     mocker.patch(
-        "src.main.analyzer.analyze_risk", return_value=mock_risk
+        "src.main.analyzer.assess_risk", return_value=mock_risk
     )
 
 
@@ -84,3 +87,167 @@ def test_health_check():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"status": "ok", "message": "Legal LLM API is running!"}
+
+
+def test_job_lifecycle(mock_legal_analyzer):
+    """
+    Tests that a job submitted to /jobs runs in the background and can be polled.
+    """
+    response = client.post("/jobs", json={"text": SAMPLE_TEXT})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    for _ in range(50):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.05)
+
+    assert job["status"] == "completed"
+    assert job["result"]["risk_assessment"] == "Medium Risk"
+
+    # Deleting a finished job forgets it
+    assert client.delete(f"/jobs/{job_id}").status_code == 200
+    assert client.get(f"/jobs/{job_id}").status_code == 404
+
+
+def test_job_queue_full_returns_429(mocker):
+    """
+    Tests that a full job queue is reported as 429 with a Retry-After header.
+    """
+    mocker.patch("src.main.job_manager.submit", side_effect=QueueFullError(retry_after=7))
+
+    response = client.post("/jobs", json={"text": SAMPLE_TEXT})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+
+
+def test_analyze_document_stream(mocker):
+    """
+    Tests that /analyze/stream emits the risk result first, then entities and
+    chunk summaries, and finishes with a completion record.
+    """
+    mocker.patch(
+        "src.main.analyzer.assess_risk",
+        return_value={"label": "Medium Risk", "score": 2.0, "categories": ["indemnification"], "clauses": []},
+    )
+    mocker.patch(
+        "src.main.analyzer.iter_clauses",
+        return_value=iter([(0, [{"entity": "ORG", "word": "Service Provider", "score": 0.99, "start": 79, "end": 95}])]),
+    )
+    mocker.patch("src.main.analyzer.iter_summary_chunks", return_value=iter([("chunk one", 4), ("chunk two", 5)]))
+    summaries = mocker.patch(
+        "src.main.analyzer.iter_chunk_summaries",
+        return_value=iter([(1, "Second summary."), (0, "First summary.")]),
+    )
+
+    response = client.post("/analyze/stream", json={"text": SAMPLE_TEXT})
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines() if line]
+    assert [record["type"] for record in records] == ["risk", "entities", "summary", "summary", "complete"]
+    assert records[0]["risk_assessment"] == "Medium Risk"
+    assert records[-1]["summary"] == "First summary. Second summary."
+    assert records[-1]["entity_count"] == 1
+    # The token counts from chunking are reused
+    summaries.assert_called_once_with(["chunk one", "chunk two"], token_lengths=[4, 5])
+
+
+def test_cache_admin_endpoints():
+    """
+    Tests that the cache counters can be read and the cache can be invalidated.
+    """
+    response = client.get("/admin/cache")
+    assert response.status_code == 200
+    assert {"memory_hits", "disk_hits", "misses", "evictions"} <= set(response.json())
+
+    response = client.post("/admin/cache/invalidate", json={"text": SAMPLE_TEXT})
+    assert response.status_code == 200
+    assert "removed" in response.json()
+
+
+def test_healthz():
+    """
+    Tests the liveness probe, which must not depend on the models being loaded.
+    """
+    response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_analyze_document_risk_only(mocker):
+    """
+    Tests that a risk-only request never touches the NER or summarization models.
+    """
+    mocker.patch(
+        "src.main.analyzer.assess_risk",
+        return_value={"label": "Low Risk", "score": 0.0, "categories": [], "clauses": []},
+    )
+    extract = mocker.patch("src.main.analyzer.extract_clauses")
+    summarize = mocker.patch("src.main.analyzer.summarize_document")
+
+    response = client.post("/analyze", json={"text": SAMPLE_TEXT, "tasks": ["risk"]})
+
+    assert response.status_code == 200
+    assert response.json()["risk_assessment"] == "Low Risk"
+    assert "summary" not in response.json()
+    extract.assert_not_called()
+    summarize.assert_not_called()
+
+
+def test_analyze_document_profile_and_metrics(mock_legal_analyzer):
+    """
+    Tests the per-stage profile, the request id header and the Prometheus metrics endpoint.
+    """
+    response = client.post(
+        "/analyze", json={"text": SAMPLE_TEXT, "profile": True}, headers={"X-Request-ID": "test-request"}
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "test-request"
+    stages = [record["stage"] for record in response.json()["profile"]]
+    assert {"risk", "clauses", "summary", "analysis"} <= set(stages)
+    assert all(record["request_id"] == "test-request" for record in response.json()["profile"])
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'legal_analyzer_stage_seconds_count{stage="summary"}' in metrics.text
+    assert 'legal_analyzer_requests_total{endpoint="/analyze",status="200"}' in metrics.text
+
+    # Requests are counted per route template, not per id
+    assert client.get("/jobs/no-such-job").status_code == 404
+    metrics = client.get("/metrics")
+    assert 'legal_analyzer_requests_total{endpoint="/jobs/{job_id}",status="404"}' in metrics.text
+    assert "no-such-job" not in metrics.text
+
+
+def test_analyze_upload_text_file_columnar(mock_legal_analyzer):
+    """
+    Tests the upload endpoint with a .txt file and the columnar entity format.
+    """
+    response = client.post(
+        "/analyze/upload",
+        files={"file": ("contract.txt", SAMPLE_TEXT.encode("utf-8"), "text/plain")},
+        data={"entity_format": "columnar", "include_text": "true"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["extracted_clauses"]["word"] == ["indemnify"]
+    assert list(data["extracted_clauses"]) == ["entity", "score", "word", "start", "end"]
+    assert data["text"] == SAMPLE_TEXT
+
+    unsupported = client.post("/analyze/upload", files={"file": ("contract.docx", b"data", "application/octet-stream")})
+    assert unsupported.status_code == 415
+
+
+def test_large_json_responses_are_gzipped(mocker):
+    """
+    Tests that JSON responses above the size threshold are compressed when the client accepts gzip.
+    """
+    mocker.patch("src.main.analyzer.extract_clauses", return_value=[{"entity_group": "ORG", "word": "Acme", "score": 0.9}] * 200)
+    response = client.post(
+        "/analyze", json={"text": SAMPLE_TEXT, "tasks": ["clauses"]}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()["extracted_clauses"]) == 200
@@ -0,0 +1,69 @@
+import threading
+from src.batching import MicroBatcher
+
+
+def test_micro_batcher_shares_batches_across_callers():
+    """
+    Items submitted from several threads are processed together and each caller
+    gets back the result for its own item.
+    """
+    seen_batches = []
+
+    def process(items):
+        seen_batches.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50)
+    results = {}
+
+    def caller(n):
+        results[n] = batcher.submit(n).result(timeout=5)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {n: n * 10 for n in range(8)}
+    assert max(len(batch) for batch in seen_batches) > 1
+    assert batcher.stats()["items"] == 8
+
+
+def test_micro_batcher_propagates_errors():
+    """
+    A failing batch raises the error in every caller that was part of it.
+    """
+    def process(items):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=1)
+    future = batcher.submit("chunk")
+
+    try:
+        future.result(timeout=5)
+        assert False, "expected the batch error to be raised"
+    except ValueError as e:
+        assert str(e) == "model failed"
+
+
+def test_micro_batcher_survives_bad_results():
+    """
+    A batch with the wrong number of results fails its callers, and later batches still run.
+    """
+    def process(items):
+        if "short" in items:
+            return iter(items[:-1])
+        return iter(item.upper() for item in items)
+
+    batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=500)
+    futures = [batcher.submit("short"), batcher.submit("other")]
+    for future in futures:
+        try:
+            future.result(timeout=5)
+            assert False, "expected the batch to fail"
+        except ValueError as e:
+            assert "returned 1 results for 2 items" in str(e)
+
+    assert batcher.submit("chunk").result(timeout=5) == "CHUNK"
+    assert batcher.stats()["failed_batches"] == 1
@@ -0,0 +1,37 @@
+import re
+
+from src.chunking import iter_token_chunks
+
+
+class WhitespaceTokenizer:
+    """
+    Stands in for a fast tokenizer: one token per word or punctuation mark, with offsets.
+    """
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=True, verbose=False):
+        return {"offset_mapping": [match.span() for match in re.finditer(r"\w+|[^\w\s]", text)]}
+
+
+TEXT = " ".join(f"Clause {i} binds the parties for {i} years." for i in range(60))
+
+
+def test_chunks_fit_the_budget_and_end_on_sentences():
+    """
+    Every chunk fits the token budget and, when possible, ends at a sentence boundary.
+    """
+    chunks = list(iter_token_chunks(TEXT, WhitespaceTokenizer(), max_tokens=40, block_chars=300))
+
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(TEXT)
+    assert all(num_tokens <= 40 for _, _, num_tokens in chunks)
+    assert all(TEXT[start:end].endswith(".") for start, end, _ in chunks)
+    # Consecutive chunks without overlap tile the text
+    assert all(chunks[i][1] < chunks[i + 1][0] for i in range(len(chunks) - 1))
+
+
+def test_chunks_overlap():
+    """
+    With overlap, each chunk starts inside the previous one.
+    """
+    chunks = list(iter_token_chunks(TEXT, WhitespaceTokenizer(), max_tokens=40, overlap=10))
+
+    assert all(chunks[i + 1][0] < chunks[i][1] for i in range(len(chunks) - 1))
+    assert all(num_tokens <= 40 for _, _, num_tokens in chunks)
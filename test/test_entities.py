@@ -0,0 +1,46 @@
+from src.models import dedupe_entities, merge_entity_pieces
+
+TEXT = "Payment is due to Acme Widgets Inc within the Services described below."
+
+
+def piece(entity, word, start, end, score=0.9):
+    return {"entity": entity, "word": word, "start": start, "end": end, "score": score}
+
+
+def test_merge_entity_pieces_joins_subwords_and_continuations():
+    """
+    B-/I- tags and ## subword pieces become one span with the document text as its word.
+    """
+    pieces = [
+        piece("B-ORG", "Ac", 18, 20, 0.8),
+        piece("I-ORG", "##me", 20, 22, 1.0),
+        piece("I-ORG", "Widgets", 23, 30),
+        piece("B-ORG", "Inc", 31, 34),
+    ]
+    merged = merge_entity_pieces(pieces, TEXT)
+
+    assert [(e["word"], e["start"], e["end"]) for e in merged] == [("Acme Widgets", 18, 30), ("Inc", 31, 34)]
+    assert merged[0]["entity"] == "ORG"
+    assert abs(merged[0]["score"] - 0.9) < 1e-9
+
+
+def test_dedupe_entities_resolves_overlapping_hits():
+    """
+    Identical spans keep the best score, contained spans are dropped, and of two partially
+    overlapping spans of the same type the one farther from its chunk edge wins.
+    """
+    entities = [
+        piece("ORG", "Acme Widgets", 18, 30, 0.7),
+        piece("ORG", "Acme Widgets", 18, 30, 0.9),
+        piece("ORG", "Acme", 18, 22, 0.99),
+        dict(piece("ORG", "the Services", 42, 54), _margin=3),
+        dict(piece("ORG", "Services described", 46, 64), _margin=40),
+        piece("MISC", "Services", 46, 54),
+    ]
+    unique = dedupe_entities(entities)
+
+    assert [(e["entity"], e["word"], e["score"]) for e in unique] == [
+        ("ORG", "Acme Widgets", 0.9),
+        ("MISC", "Services", 0.9),
+        ("ORG", "Services described", 0.9),
+    ]
@@ -0,0 +1,29 @@
+from src.extractive import select_within_budget, textrank_scores
+
+
+def test_textrank_prefers_central_chunks():
+    """
+    A chunk that shares vocabulary with the rest of the document outranks an unrelated one.
+    """
+    chunks = [
+        "The supplier shall indemnify the customer against all losses.",
+        "The supplier shall pay all losses caused by the supplier.",
+        "The customer shall notify the supplier of any losses.",
+        "Headings are for convenience only.",
+    ]
+    scores = textrank_scores(chunks)
+
+    assert abs(float(scores.sum()) - 1.0) < 1e-4
+    assert scores.argmin() == 3
+
+
+def test_select_within_budget_keeps_document_order():
+    """
+    The highest scoring chunks are taken while they fit, and returned in document order.
+    """
+    scores = [0.1, 0.5, 0.3, 0.1]
+    costs = [10, 10, 10, 10]
+
+    assert select_within_budget(scores, costs, budget=20) == [1, 2]
+    # The best chunk is kept even if it exceeds the budget on its own
+    assert select_within_budget(scores, [10, 50, 10, 10], budget=20) == [1]
@@ -0,0 +1,61 @@
+from src.risk import RiskEngine
+
+
+def test_risk_terms_respect_word_boundaries():
+    """
+    A keyword inside a longer word (e.g. "default" in "defaulted") is not a hit.
+    """
+    engine = RiskEngine({"default": 1.0})
+
+    assert engine.find_matches("The Buyer defaulted on payment.") == []
+    assert [m["term"] for m in engine.find_matches("An Event of DEFAULT occurred.")] == ["default"]
+
+
+def test_risk_assessment_returns_clause_spans():
+    """
+    Each risky clause is returned with its character span and the terms it matched.
+    """
+    engine = RiskEngine({"indemnify": 2.0, "terminate": 1.0, "material breach": 3.0}, high_threshold=4.0)
+    text = (
+        "The Service Provider shall indemnify the Client. "
+        "Payment is due in 30 days. "
+        "Either party may terminate upon a material   breach."
+    )
+
+    report = engine.assess(text)
+
+    assert report["label"] == "High Risk"
+    assert report["score"] == 6.0
+    spans = [text[clause["start"]:clause["end"]] for clause in report["clauses"]]
+    assert spans == [
+        "The Service Provider shall indemnify the Client.",
+        "Either party may terminate upon a material   breach.",
+    ]
+    assert report["clauses"][1]["terms"] == ["terminate", "material breach"]
+
+
+def test_case_folded_matches_map_back_to_their_terms():
+    """
+    Case-insensitive matching accepts characters that do not lowercase to the term
+    (dotted and dotless i, long s); they still map to their lexicon entry.
+    """
+    engine = RiskEngine()
+    for text, term in [
+        ("LIABİLITY here", "liability"),
+        ("lıability", "liability"),
+        ("ſole discretion", "sole discretion"),
+        ("penaltieſ", "penalties"),
+    ]:
+        assert [m["term"] for m in engine.find_matches(text)] == [term]
+        assert engine.assess(text)["score"] == 1.0
+
+
+def test_default_thresholds_match_the_keyword_count_rule():
+    """
+    As with the original rule (more than three keyword hits), four risk categories are High Risk.
+    """
+    engine = RiskEngine()
+
+    assert engine.assess("We may terminate, indemnify, accept liability and breach.")["label"] == "High Risk"
+    assert engine.assess("We may terminate, indemnify and accept liability.")["label"] == "Medium Risk"
+    assert engine.assess("Payment is due in 30 days.")["label"] == "Low Risk"
@@ -0,0 +1,43 @@
+from src.search import SearchIndex, SearchIndexBuilder
+
+INDEMNITY = "Acme Corporation shall indemnify and hold harmless Beta Logistics against all losses."
+INVOICES = "Invoices are issued monthly by Gamma Holdings in London."
+
+
+def build_index(path):
+    builder = SearchIndexBuilder(chunk_words=20)
+    builder.add(1, INDEMNITY, {
+        "risk_assessment": "High Risk",
+        "extracted_clauses": [{"entity": "ORG", "word": "Acme Corporation", "start": 0, "end": 16, "score": 0.9}],
+        "risky_clauses": [{"start": 0, "end": len(INDEMNITY), "terms": ["indemnify", "hold harmless"]}],
+    }, contract_path="acme.pdf")
+    builder.add(2, INVOICES, {
+        "risk_assessment": "Low Risk",
+        "extracted_clauses": [{"entity": "LOC", "word": "London", "start": 49, "end": 55, "score": 0.9}],
+        "risky_clauses": [],
+    }, contract_path="gamma.pdf")
+    builder.write(str(path))
+    return SearchIndex(str(path))
+
+
+def test_search_ranks_matching_clause_first(tmp_path):
+    """
+    The chunk sharing terms (and risk terms) with the query ranks first.
+    """
+    index = build_index(tmp_path)
+    results = index.search("indemnify against losses", k=2)
+
+    assert [result["doc_id"] for result in results] == [1, 2]
+    assert results[0]["contract_path"] == "acme.pdf"
+    assert results[0]["text"] == INDEMNITY
+
+
+def test_search_filters_by_risk_and_entity_type(tmp_path):
+    """
+    Risk level and entity type filters restrict the candidate chunks.
+    """
+    index = build_index(tmp_path)
+
+    assert [r["doc_id"] for r in index.search("indemnify", risk_levels=["Low Risk"])] == [2]
+    assert [r["doc_id"] for r in index.search("indemnify", entity_types=["LOC"])] == [2]
+    assert index.search("indemnify", entity_types=["PER"]) == []
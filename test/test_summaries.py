@@ -0,0 +1,105 @@
+import time
+import numpy as np
+
+from src.models import LegalAnalyzer
+
+
+class FakeEncoding(dict):
+    def to(self, device):
+        return self
+
+
+class FakeTokenizer:
+    """
+    One id per word, padded with 0. Decoding shows what generate was asked to do.
+    """
+    model_max_length = 512
+
+    def __init__(self):
+        self.vocab = {}
+
+    def __call__(self, texts, padding=False, truncation=False, max_length=None, return_tensors=None):
+        texts = [texts] if isinstance(texts, str) else texts
+        rows = [[self.vocab.setdefault(word, len(self.vocab) + 1) for word in text.split()] for text in texts]
+        width = max(len(row) for row in rows)
+        return FakeEncoding(
+            input_ids=np.array([row + [0] * (width - len(row)) for row in rows]),
+            attention_mask=np.array([[1] * len(row) + [0] * (width - len(row)) for row in rows]),
+        )
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        words = {i: word for word, i in self.vocab.items()}
+        return [" ".join(words[i] for i in ids) + f" | {settings}" for ids, settings in outputs]
+
+
+class FakeModel:
+    device = "cpu"
+
+    def generate(self, input_ids, attention_mask, generation_config=None, max_length=None, min_length=None, do_sample=None):
+        settings = (generation_config["num_beams"], max_length, min_length, do_sample)
+        return [([i for i, keep in zip(ids, mask) if keep][:3], settings) for ids, mask in zip(input_ids, attention_mask)]
+
+
+class FakeSummarizationPipeline:
+    """
+    Mirrors transformers' summarization pipeline: the task prefix and the task-specific
+    generation settings live on the pipeline, not on the model config.
+    """
+    prefix = "summarize: "
+    generation_config = {"num_beams": 4}
+
+    def __init__(self):
+        self.tokenizer = FakeTokenizer()
+        self.model = FakeModel()
+
+    def __call__(self, text, **generate_kwargs):
+        inputs = self.tokenizer(self.prefix + text)
+        output = self.model.generate(**inputs, generation_config=self.generation_config, **generate_kwargs)
+        return [{"summary_text": summary} for summary in self.tokenizer.batch_decode(output)]
+
+
+def test_batched_summaries_match_the_serial_pipeline():
+    """
+    Batched generation uses the pipeline's prefix, generation config and each chunk's own
+    length limits, so it produces what the one-chunk-at-a-time pipeline call produces.
+    """
+    analyzer = LegalAnalyzer()
+    analyzer.summarizer_pipeline = FakeSummarizationPipeline()
+    chunks = ["The Supplier shall deliver the goods.", " ".join(["Payment is due within thirty days."] * 40), "Notice."]
+
+    serial = []
+    for chunk in chunks:
+        max_length, min_length = analyzer._dynamic_summary_lengths(chunk)
+        output = analyzer.summarizer_pipeline(chunk, max_length=max_length, min_length=min_length, do_sample=False)
+        serial.append(output[0]["summary_text"])
+
+    assert analyzer._generate_summaries(chunks) == serial
+    assert serial[0].startswith("summarize: The")
+
+
+class SlowModel(FakeModel):
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, input_ids, attention_mask, **generate_kwargs):
+        self.calls += 1
+        time.sleep(0.05)
+        return super().generate(input_ids, attention_mask, **generate_kwargs)
+
+
+def test_time_budget_applies_before_any_summary_was_timed():
+    """
+    With no measured cost yet, the best chunk is summarized first to calibrate, and a time
+    budget it already used up stops the rest.
+    """
+    analyzer = LegalAnalyzer()
+    analyzer.summarizer_pipeline = FakeSummarizationPipeline()
+    analyzer.summarizer_pipeline.model = SlowModel()
+    chunks = [f"Clause {i} says the Supplier shall deliver {i} goods." for i in range(60)]
+    analyzer._summary_chunks_with_lengths = lambda text, max_chunk_tokens=None: (chunks, [10] * len(chunks))
+
+    summary = analyzer.summarize_document(" ".join(chunks), time_budget=0.01)
+
+    assert analyzer.summarizer_pipeline.model.calls == 1
+    assert analyzer.summary_seconds_per_token is not None
+    assert summary
@@ -0,0 +1,90 @@
+import re
+
+from src.versioning import analyze_revision, content_defined_chunks, diff_revisions
+
+TEXT = " ".join(
+    f"Section {i}: the {['Supplier', 'Buyer', 'Agent'][i % 3]} shall deliver item {i * 7} by day {i % 28}."
+    for i in range(400)
+)
+INSERTED = " The Supplier shall indemnify Acme against all losses."
+
+
+class FakeAnalyzer:
+    """
+    Stands in for LegalAnalyzer: capitalized words are entities and a summary is the first sentence.
+    Records which texts reach the models.
+    """
+    ner_model_path = "fake-ner"
+    summarization_model_path = "fake-summarizer"
+    draft_model_path = None
+    backend = "pytorch"
+
+    def __init__(self):
+        self.ner_chars = 0
+        self.ner_calls = 0
+        self.summarized = 0
+
+    def extract_clauses(self, text):
+        self.ner_calls += 1
+        self.ner_chars += len(text)
+        return [
+            {"entity": "ORG", "word": match.group(), "score": 0.9, "start": match.start(), "end": match.end()}
+            for match in re.finditer(r"\b(?:Supplier|Acme)\b", text)
+        ]
+
+    def split_for_summary(self, text):
+        return [text]
+
+    def iter_chunk_summaries(self, chunks):
+        for i, chunk in enumerate(chunks):
+            self.summarized += 1
+            yield i, chunk.split(".")[0]
+
+    def assess_risk(self, text):
+        label = "High Risk" if "indemnify" in text else "Low Risk"
+        return {"label": label, "score": float(text.count("indemnify")), "clauses": []}
+
+
+def test_chunk_boundaries_survive_an_insertion():
+    """
+    Inserting a sentence changes only the chunks around it.
+    """
+    cut = TEXT.index("Section 200:")
+    revised = TEXT[:cut] + INSERTED.strip() + " " + TEXT[cut:]
+    before = {TEXT[start:end] for start, end in content_defined_chunks(TEXT)}
+    after = [revised[start:end] for start, end in content_defined_chunks(revised)]
+
+    assert "".join(after) == revised
+    assert len(after) > 5
+    assert sum(chunk not in before for chunk in after) <= 2
+
+
+def test_revision_recomputes_only_the_edit():
+    """
+    Unchanged chunks reuse their results with shifted offsets, and the diff shows the new entity.
+    """
+    analyzer = FakeAnalyzer()
+    first, _ = analyze_revision(analyzer, TEXT)
+    first["version"] = 1
+
+    cut = TEXT.index("Section 200:")
+    revised = TEXT[:cut] + INSERTED.strip() + " " + TEXT[cut:]
+    analyzer.ner_chars = analyzer.ner_calls = analyzer.summarized = 0
+    second, stats = analyze_revision(analyzer, revised, previous=first)
+
+    assert stats["reused_chunks"] >= stats["chunks"] - 2
+    # The edited chunks go through NER together, in one call
+    assert analyzer.ner_calls == 1
+    assert stats["recomputed_chars"] <= analyzer.ner_chars < len(revised) // 5
+    assert second["base_version"] == 1
+    assert analyzer.summarized <= 2
+    # Every entity, reused or not, points at its text in the new version
+    assert all(revised[e["start"]:e["end"]] == e["word"] for e in second["result"]["extracted_clauses"])
+    assert second["result"]["extracted_clauses"] == analyzer.extract_clauses(revised)
+
+    diff = diff_revisions(first, second)
+    assert diff["base_version"] == 1
+    assert sorted(entity["word"] for entity in diff["entities"]["added"]) == ["Acme", "Supplier"]
+    assert diff["entities"]["removed"] == []
+    assert diff["risk"]["old"] == "Low Risk" and diff["risk"]["new"] == "High Risk"
+    assert all(change["new"][0] <= cut <= change["new"][1] for change in diff["changes"])
@@ -0,0 +1,383 @@
+import bisect
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from .chunking import SENTENCE_BOUNDARY, cut_at_whitespace
+from .metrics import span
+
+# Characters before a sentence end that decide whether it becomes a chunk boundary
+HASH_WINDOW = 64
+# A sentence end is a boundary when its window hash is divisible by this, so chunks hold about 8 sentences
+BOUNDARY_DIVISOR = 8
+MIN_CHUNK_CHARS = 400
+MAX_CHUNK_CHARS = 4000
+VERSION_TASKS = ("risk", "clauses", "summary")
+# Joins the edited chunks into one text for a single NER call
+CHUNK_SEPARATOR = "\n\n"
+
+_HASH_BASE = 0x100000001B3
+_HASH_BASE_INVERSE = pow(_HASH_BASE, -1, 2 ** 64)
+
+
+def _gear_table(size: int = 1 << 16) -> np.ndarray:
+    """
+    Maps character codes to well-mixed 64-bit values (splitmix64), so similar
+    characters do not produce similar hashes.
+    """
+    z = np.arange(size, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+_GEAR = _gear_table()
+
+
+def window_hashes(text: str, positions, window: int = HASH_WINDOW) -> np.ndarray:
+    """
+    Returns the Rabin-Karp hash (mod 2**64) of the `window` characters before each position.
+
+    The rolling hash is evaluated for all positions at once from prefix sums of the
+    characters weighted by inverse powers of the base.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if not len(positions):
+        return np.zeros(0, dtype=np.uint64)
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+    with np.errstate(over="ignore"):
+        values = _GEAR[codes & 0xFFFF] ^ (codes >> 16).astype(np.uint64)
+        inverse_powers = np.cumprod(np.full(len(codes), _HASH_BASE_INVERSE, dtype=np.uint64))
+        prefix = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(values * inverse_powers)])
+        starts = np.maximum(positions - window, 0)
+        powers = np.ones(len(positions), dtype=np.uint64)
+        # base ** position for each position, by square-and-multiply over the exponent bits
+        base, exponents = np.uint64(_HASH_BASE), positions.astype(np.uint64)
+        while exponents.any():
+            powers = np.where(exponents & np.uint64(1), powers * base, powers)
+            base, exponents = base * base, exponents >> np.uint64(1)
+        return (prefix[positions] - prefix[starts]) * powers
+
+
+def content_defined_chunks(text: str, window: int = HASH_WINDOW, divisor: int = BOUNDARY_DIVISOR, min_chars: int = MIN_CHUNK_CHARS, max_chars: int = MAX_CHUNK_CHARS):
+    """
+    Splits text into chunks at content-defined boundaries and returns (start, end)
+    pairs that tile it.
+
+    Candidate boundaries are sentence ends, and one is taken when the rolling hash of
+    the characters before it is divisible by `divisor`. Whether a sentence end is a
+    boundary depends only on nearby text, so an edit changes the chunks around it and
+    every other chunk keeps its exact text. Chunks shorter than min_chars are extended;
+    chunks that reach max_chars without a boundary are cut at whitespace, and the
+    chunking resynchronizes at the next content-defined boundary.
+    """
+    matches = [(match.start(), match.end()) for match in SENTENCE_BOUNDARY.finditer(text)]
+    hashes = window_hashes(text, [hashed_at for hashed_at, _ in matches], window)
+
+    spans = []
+    start = 0
+    for (_, cut), value in zip(matches, hashes.tolist()):
+        while cut - start > max_chars:
+            forced = cut_at_whitespace(text, start, max_chars)
+            spans.append((start, forced))
+            start = forced
+        if cut - start >= min_chars and (value >> 32) % divisor == 0:
+            spans.append((start, cut))
+            start = cut
+    while len(text) - start > max_chars:
+        forced = cut_at_whitespace(text, start, max_chars)
+        spans.append((start, forced))
+        start = forced
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+def chunk_hash(chunk: str) -> str:
+    # Entities carry offsets into the chunk, so the exact text is hashed
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def analysis_models(analyzer):
+    """
+    Identifies the models behind stored chunk results; results of other models are never reused.
+    """
+    return {
+        "ner": analyzer.ner_model_path,
+        "summarization": analyzer.summarization_model_path,
+        # Summaries from a draft model are greedy rather than beam-searched
+        "draft": analyzer.draft_model_path,
+        "backend": analyzer.backend,
+    }
+
+
+def analyze_revision(analyzer, text: str, previous=None, tasks=VERSION_TASKS):
+    """
+    Analyzes a new version of a document, reusing the chunk results of `previous`
+    (a record returned by an earlier call) wherever the chunk text is unchanged.
+
+    Only new or edited chunks go through the NER and summarization models, so the model
+    cost follows the size of the edit. Reused entities are shifted to their chunk's new
+    offset. Risk is lexicon-based and cheap, so it is assessed on the whole text.
+    Returns (record, stats); the record holds the result and the per-chunk results.
+    """
+    models = analysis_models(analyzer)
+    reusable = {}
+    if previous is not None and previous["models"] == models:
+        reusable = {chunk["hash"]: chunk for chunk in previous["chunks"]}
+
+    chunks = []
+    for start, end in content_defined_chunks(text):
+        digest = chunk_hash(text[start:end])
+        chunk = {"hash": digest, "start": start, "end": end}
+        old = reusable.get(digest)
+        for key, task in (("entities", "clauses"), ("summary", "summary")):
+            if task in tasks and old is not None and key in old:
+                chunk[key] = old[key]
+        chunks.append(chunk)
+
+    stale = [
+        chunk for chunk in chunks
+        if ("clauses" in tasks and "entities" not in chunk) or ("summary" in tasks and "summary" not in chunk)
+    ]
+    print(f"Re-analyzing {len(stale)} of {len(chunks)} chunks; the others are unchanged.")
+
+    if "clauses" in tasks:
+        edited = [chunk for chunk in chunks if "entities" not in chunk]
+        with span("revision_clauses", chunks=len(edited)):
+            extract_chunk_entities(analyzer, text, edited)
+
+    if "summary" in tasks:
+        # The pieces of all edited chunks share one length-bucketed generate loop
+        pieces, owners = [], []
+        for chunk in chunks:
+            if "summary" not in chunk:
+                chunk["summary"] = ""
+                chunk_text = text[chunk["start"]:chunk["end"]]
+                if chunk_text.strip():
+                    for piece in analyzer.split_for_summary(chunk_text):
+                        pieces.append(piece)
+                        owners.append(chunk)
+        with span("revision_summary", chunks=len(set(map(id, owners))), pieces=len(pieces)):
+            piece_summaries = [""] * len(pieces)
+            for i, summary in analyzer.iter_chunk_summaries(pieces):
+                piece_summaries[i] = summary
+        for owner, summary in zip(owners, piece_summaries):
+            if summary:
+                owner["summary"] = f"{owner['summary']} {summary}".strip()
+
+    result = {}
+    if "risk" in tasks:
+        risk_report = analyzer.assess_risk(text)
+        result["risk_assessment"] = risk_report["label"]
+        result["risk_score"] = risk_report["score"]
+        result["risky_clauses"] = risk_report["clauses"]
+    if "clauses" in tasks:
+        result["extracted_clauses"] = [entity for chunk in chunks for entity in chunk_entities(chunk)]
+    if "summary" in tasks:
+        result["summary"] = " ".join(chunk["summary"] for chunk in chunks if chunk["summary"]).strip()
+
+    base_version = previous.get("version") if previous is not None else None
+    record = {"models": models, "tasks": list(tasks), "base_version": base_version, "chunks": chunks, "result": result}
+    stats = {
+        "chunks": len(chunks),
+        "reused_chunks": len(chunks) - len(stale),
+        "recomputed_chars": sum(chunk["end"] - chunk["start"] for chunk in stale),
+    }
+    return record, stats
+
+
+def extract_chunk_entities(analyzer, text: str, chunks):
+    """
+    Sets the entities of each chunk, with chunk-relative offsets, from a single
+    extract_clauses call on the chunk texts joined by CHUNK_SEPARATOR. Entities that
+    reach across a join are dropped.
+    """
+    offsets, parts = [], []
+    position = 0
+    for chunk in chunks:
+        chunk["entities"] = []
+        offsets.append(position)
+        parts.append(text[chunk["start"]:chunk["end"]])
+        position += chunk["end"] - chunk["start"] + len(CHUNK_SEPARATOR)
+    joined = CHUNK_SEPARATOR.join(parts)
+    if not joined.strip():
+        return
+
+    for entity in analyzer.extract_clauses(joined):
+        index = bisect.bisect_right(offsets, entity["start"]) - 1
+        chunk, offset = chunks[index], offsets[index]
+        if entity["end"] - offset > chunk["end"] - chunk["start"]:
+            continue
+        chunk["entities"].append(dict(entity, start=entity["start"] - offset, end=entity["end"] - offset))
+
+
+def chunk_entities(chunk):
+    """
+    Returns the entities of a chunk with offsets into the full document.
+    """
+    return [
+        dict(entity, start=chunk["start"] + entity["start"], end=chunk["start"] + entity["end"])
+        for entity in chunk.get("entities", [])
+    ]
+
+
+def _unmatched(entities, others):
+    """
+    Returns the entities (by type and text) that have no counterpart in `others`.
+    """
+    remaining = Counter((entity["entity"], entity["word"]) for entity in others)
+    unmatched = []
+    for entity in entities:
+        key = (entity["entity"], entity["word"])
+        if remaining[key]:
+            remaining[key] -= 1
+        else:
+            unmatched.append(entity)
+    return unmatched
+
+
+def diff_revisions(old, new):
+    """
+    Compares two version records chunk by chunk.
+
+    Returns the changed regions (with character ranges in both versions and, when
+    summarized, the old and new summaries of the region), the entities added and
+    removed in those regions, and the change in risk assessment.
+    """
+    old_chunks, new_chunks = old["chunks"], new["chunks"]
+    matcher = difflib.SequenceMatcher(
+        None, [chunk["hash"] for chunk in old_chunks], [chunk["hash"] for chunk in new_chunks], autojunk=False
+    )
+
+    changes, added, removed = [], [], []
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        before, after = old_chunks[i1:i2], new_chunks[j1:j2]
+        change = {
+            "type": op,
+            "old": [before[0]["start"], before[-1]["end"]] if before else None,
+            "new": [after[0]["start"], after[-1]["end"]] if after else None,
+        }
+        if all("summary" in chunk for chunk in before + after):
+            change["old_summary"] = " ".join(chunk["summary"] for chunk in before if chunk["summary"])
+            change["new_summary"] = " ".join(chunk["summary"] for chunk in after if chunk["summary"])
+        changes.append(change)
+
+        old_entities = [entity for chunk in before for entity in chunk_entities(chunk)]
+        new_entities = [entity for chunk in after for entity in chunk_entities(chunk)]
+        added.extend(_unmatched(new_entities, old_entities))
+        removed.extend(_unmatched(old_entities, new_entities))
+
+    diff = {
+        "base_version": old.get("version"),
+        "unchanged_chunks": sum(size for _, _, size in matcher.get_matching_blocks()),
+        "changes": changes,
+        "entities": {"added": added, "removed": removed},
+    }
+    old_result, new_result = old["result"], new["result"]
+    if "risk_assessment" in old_result and "risk_assessment" in new_result:
+        diff["risk"] = {
+            "old": old_result["risk_assessment"],
+            "new": new_result["risk_assessment"],
+            "score_change": new_result["risk_score"] - old_result["risk_score"],
+        }
+    return diff
+
+
+class VersionStore:
+    """
+    Stores the analysis record of every version of a document, in memory or in a SQLite
+    file that survives restarts and can be shared by several worker processes.
+    """
+    def __init__(self, path: str = None):
+        self.path = None
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._conn = None
+        if path:
+            self.open(path)
+
+    def open(self, path: str):
+        """
+        Moves the store to a SQLite file, creating it if needed. Versions kept in memory
+        until then are not carried over.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS versions ("
+            "doc_id TEXT NOT NULL, version INTEGER NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (doc_id, version))"
+        )
+        with self._lock:
+            self.path, self._conn = path, conn
+
+    def add(self, doc_id: str, record) -> int:
+        """
+        Stores a record as the next version of the document and returns its version number.
+        """
+        with self._lock:
+            record["created_at"] = time.time()
+            if self._conn is None:
+                versions = self._memory.setdefault(doc_id, [])
+                record["version"] = len(versions) + 1
+                versions.append(record)
+                return record["version"]
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                latest = self._conn.execute("SELECT MAX(version) FROM versions WHERE doc_id = ?", (doc_id,)).fetchone()[0]
+                record["version"] = (latest or 0) + 1
+                self._conn.execute(
+                    "INSERT INTO versions (doc_id, version, value, created_at) VALUES (?, ?, ?, ?)",
+                    (doc_id, record["version"], json.dumps(record), record["created_at"]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return record["version"]
+
+    def get(self, doc_id: str, version: int = None):
+        """
+        Returns the record of one version, or of the latest version if none is given.
+        """
+        with self._lock:
+            if self._conn is None:
+                versions = self._memory.get(doc_id, [])
+                if version is None:
+                    return versions[-1] if versions else None
+                return versions[version - 1] if 0 < version <= len(versions) else None
+
+            if version is None:
+                row = self._conn.execute(
+                    "SELECT value FROM versions WHERE doc_id = ? ORDER BY version DESC LIMIT 1", (doc_id,)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT value FROM versions WHERE doc_id = ? AND version = ?", (doc_id, version)
+                ).fetchone()
+            return json.loads(row[0]) if row else None
+
+    def versions(self, doc_id: str):
+        """
+        Lists the versions of a document with their creation times.
+        """
+        with self._lock:
+            if self._conn is None:
+                rows = [(record["version"], record["created_at"]) for record in self._memory.get(doc_id, [])]
+            else:
+                rows = self._conn.execute(
+                    "SELECT version, created_at FROM versions WHERE doc_id = ? ORDER BY version", (doc_id,)
+                ).fetchall()
+        return [{"version": version, "created_at": created_at} for version, created_at in rows]
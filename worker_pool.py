@@ -0,0 +1,301 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+import torch
+
+from .cache import cached
+
+
+def _worker_main(analyzer, num_threads, task_queue, result_queue, warm_up_tasks):
+    """
+    Entry point of a forked inference worker. The analyzer's weights were loaded by
+    the parent before the fork, so they are shared with it instead of copied.
+    """
+    # Partition the cores between workers so their intra-op thread pools do not oversubscribe
+    torch.set_num_threads(num_threads)
+    # Connections and background threads do not survive a fork; the parent handles caching
+    analyzer.cache = None
+    analyzer.micro_batching = False
+
+    try:
+        if warm_up_tasks:
+            analyzer.warm_up(warm_up_tasks)
+        result_queue.put((None, True, "ready"))
+    except Exception as e:
+        result_queue.put((None, False, str(e)))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, method, args, kwargs = task
+        try:
+            result = getattr(analyzer, method)(*args, **kwargs)
+            # Generators cannot cross the process boundary, so they are materialized here
+            if method.startswith("iter_"):
+                result = list(result)
+            result_queue.put((task_id, True, result))
+        except Exception as e:
+            result_queue.put((task_id, False, f"{type(e).__name__}: {e}"))
+
+
+class ModelWorkerPool:
+    """
+    Loads the models once in the parent process and forks `num_workers` inference
+    workers that share the weights.
+
+    Model parameters are moved to shared memory before forking, so every worker maps
+    the same pages and memory stays close to a single copy of the models. Each task
+    goes to the worker with the fewest tasks in flight.
+
+    `spare_workers` extra workers are forked and warmed up together with the others.
+    A worker that dies fails its in-flight tasks and a spare takes its place. Workers
+    are never forked once the pool runs: by then the server's threads are running, and
+    a child forked from a multithreaded process can deadlock on a lock another thread
+    held at the time of the fork. Without a spare left, the pool continues with the
+    workers it still has.
+    """
+    def __init__(self, analyzer, num_workers: int = 2, threads_per_worker: int = None, warm_up_tasks=("clauses", "summary"), spare_workers: int = 1):
+        self.analyzer = analyzer
+        self.num_workers = num_workers
+        self.spare_workers = spare_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.warm_up_tasks = list(warm_up_tasks)
+        self._context = multiprocessing.get_context("fork")
+        self._result_queue = self._context.Queue()
+        # One slot per worker; a slot whose worker died with no spare left holds None
+        self._task_queues = []
+        self._processes = []
+        self._in_flight = []
+        # (process, task_queue) of the idle spare workers
+        self._spares = []
+        self._pending = {}
+        self._task_workers = {}
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._ready_count = 0
+        self._startup_error = None
+        self._dispatcher = None
+        self._stopping = False
+
+    def start(self):
+        """
+        Loads the models, forks the workers and spares and waits until they have warmed up.
+        """
+        with self._lock:
+            if self._processes:
+                return
+            self._load_shared_weights()
+
+            print(f"[Pool] Forking {self.num_workers} model workers and {self.spare_workers} spare workers with {self.threads_per_worker} threads each...")
+            for worker_id in range(self.num_workers):
+                process, task_queue = self._fork_worker(f"model-worker-{worker_id}")
+                self._processes.append(process)
+                self._task_queues.append(task_queue)
+                self._in_flight.append(set())
+            for spare_id in range(self.spare_workers):
+                self._spares.append(self._fork_worker(f"model-worker-spare-{spare_id}"))
+
+            self._dispatcher = threading.Thread(target=self._collect_results, name="model-pool-results", daemon=True)
+            self._dispatcher.start()
+
+        self._ready.wait()
+        if self._startup_error:
+            raise RuntimeError(f"Model worker failed to start: {self._startup_error}")
+        print("[Pool] All model workers are ready.")
+
+    def _fork_worker(self, name: str):
+        task_queue = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.analyzer, self.threads_per_worker, task_queue, self._result_queue, self.warm_up_tasks),
+            name=name,
+            daemon=True,
+        )
+        process.start()
+        return process, task_queue
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+            for task_queue in self._task_queues + [task_queue for _, task_queue in self._spares]:
+                if task_queue is not None:
+                    task_queue.put(None)
+        for process in self._processes + [process for process, _ in self._spares]:
+            if process is not None:
+                process.join(timeout=10)
+
+    def submit(self, method: str, *args, **kwargs) -> Future:
+        """
+        Runs analyzer.<method>(*args, **kwargs) on the least busy worker.
+        """
+        self.start()
+        future = Future()
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("The model worker pool has been stopped.")
+            # A dead worker has no tasks in flight and would otherwise attract every new task
+            self._replace_dead_workers()
+            workers = [w for w in range(self.num_workers) if self._processes[w] is not None]
+            if not workers:
+                raise RuntimeError("All model workers have died.")
+            task_id = next(self._task_ids)
+            worker_id = min(workers, key=lambda w: len(self._in_flight[w]))
+            self._pending[task_id] = future
+            self._task_workers[task_id] = worker_id
+            self._in_flight[worker_id].add(task_id)
+            self._task_queues[worker_id].put((task_id, method, args, kwargs))
+        return future
+
+    def call(self, method: str, *args, **kwargs):
+        return self.submit(method, *args, **kwargs).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.num_workers,
+                "threads_per_worker": self.threads_per_worker,
+                "alive": sum(process is not None and process.is_alive() for process in self._processes),
+                "spares": sum(process.is_alive() for process, _ in self._spares),
+                "in_flight": [len(tasks) for tasks in self._in_flight],
+            }
+
+    def _load_shared_weights(self):
+        # Only load here; running inference in the parent would start thread pools that are not fork-safe
+        for name in self.analyzer.model_names():
+            model = self.analyzer._get_pipeline(name).model
+            # ONNX Runtime sessions are not torch modules; their weights are shared by the fork alone
+            if isinstance(model, torch.nn.Module):
+                model.eval()
+                model.share_memory()
+
+    def _collect_results(self):
+        while True:
+            try:
+                message = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                message = None
+            # Checked on every message too, so a dead worker is noticed while others keep answering
+            self._fail_dead_workers()
+            if message is None:
+                continue
+            task_id, ok, result = message
+
+            if task_id is None:
+                # Startup message from a worker or spare
+                if not ok:
+                    self._startup_error = result
+                    self._ready.set()
+                else:
+                    self._ready_count += 1
+                    if self._ready_count == self.num_workers + self.spare_workers:
+                        self._ready.set()
+                continue
+
+            with self._lock:
+                future = self._pending.pop(task_id, None)
+                worker_id = self._task_workers.pop(task_id, None)
+                if worker_id is not None:
+                    self._in_flight[worker_id].discard(task_id)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    def _fail_dead_workers(self):
+        with self._lock:
+            if not self._ready.is_set():
+                processes = self._processes + [process for process, _ in self._spares]
+                if any(not process.is_alive() for process in processes):
+                    self._startup_error = "a model worker exited during startup"
+                    self._ready.set()
+                return
+            if not self._stopping:
+                self._replace_dead_workers()
+
+    def _replace_dead_workers(self):
+        """
+        Fails the in-flight tasks of every worker that has exited and moves a spare
+        into its slot. Called with the lock held.
+        """
+        for worker_id, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            for task_id in self._in_flight[worker_id]:
+                self._task_workers.pop(task_id, None)
+                future = self._pending.pop(task_id, None)
+                if future is not None:
+                    future.set_exception(RuntimeError(f"Model worker {worker_id} died."))
+            self._in_flight[worker_id].clear()
+            # Tasks still queued for the dead worker were failed above, so its queue is dropped
+            self._task_queues[worker_id].close()
+            self._task_queues[worker_id].cancel_join_thread()
+
+            self._spares = [(spare, task_queue) for spare, task_queue in self._spares if spare.is_alive()]
+            if self._spares:
+                print(f"[Pool] Model worker {worker_id} exited with code {process.exitcode}; a spare takes its place.")
+                self._processes[worker_id], self._task_queues[worker_id] = self._spares.pop(0)
+            else:
+                print(f"[Pool] Model worker {worker_id} exited with code {process.exitcode} and no spare is left.")
+                self._processes[worker_id] = self._task_queues[worker_id] = None
+
+
+class PooledAnalyzer:
+    """
+    Drop-in replacement for LegalAnalyzer that runs model inference on a ModelWorkerPool.
+
+    Risk analysis needs no model and runs in the calling process, as does result caching.
+    """
+    def __init__(self, analyzer, num_workers: int = 2, threads_per_worker: int = None, spare_workers: int = 1):
+        self.analyzer = analyzer
+        self.cache = analyzer.cache
+        self.ner_model_path = analyzer.ner_model_path
+        self.summarization_model_path = analyzer.summarization_model_path
+        self.draft_model_path = analyzer.draft_model_path
+        self.backend = analyzer.backend
+        self.load_times = analyzer.load_times
+        self.pool = ModelWorkerPool(analyzer, num_workers=num_workers, threads_per_worker=threads_per_worker, spare_workers=spare_workers)
+
+    def warm_up(self, tasks=("clauses", "summary")):
+        self.pool.warm_up_tasks = list(tasks)
+        self.pool.start()
+
+    def loaded_models(self):
+        return self.analyzer.loaded_models()
+
+    def batching_stats(self):
+        return {"enabled": False, "worker_pool": self.pool.stats()}
+
+    def analyze_risk(self, text: str) -> str:
+        return self.analyzer.analyze_risk(text)
+
+    def assess_risk(self, text: str):
+        return self.analyzer.assess_risk(text)
+
+    def split_for_summary(self, text: str, max_chunk_tokens: int = None):
+        return self.analyzer.split_for_summary(text, max_chunk_tokens)
+
+    def iter_summary_chunks(self, text: str, max_chunk_tokens: int = None):
+        return self.analyzer.iter_summary_chunks(text, max_chunk_tokens)
+
+    # Same cache keys as LegalAnalyzer, so pooled and in-process servers share cached results
+    @cached(model_attrs=("ner_model_path", "backend"), exact_text=True)
+    def extract_clauses(self, text: str, chunk_size: int = None, overlap: int = 50, batch_size: int = None):
+        return self.pool.call("extract_clauses", text, chunk_size, overlap, batch_size)
+
+    @cached(model_attrs=("summarization_model_path", "draft_model_path", "backend"))
+    def summarize_document(self, text: str, max_chunk_length: int = 1024, batched: bool = True, batch_size: int = None, token_budget: int = None, time_budget: float = None, reduce: bool = False, max_chunk_tokens: int = None):
+        return self.pool.call("summarize_document", text, max_chunk_length, batched, batch_size, token_budget, time_budget, reduce, max_chunk_tokens)
+
+    def iter_clauses(self, text: str, chunk_size: int = None, overlap: int = 50, batch_size: int = None):
+        yield from self.pool.call("iter_clauses", text, chunk_size, overlap, batch_size)
+
+    def iter_chunk_summaries(self, chunks, batch_size: int = None, token_lengths=None):
+        yield from self.pool.call("iter_chunk_summaries", chunks, batch_size, token_lengths)